@@ -0,0 +1,72 @@
+"""Micro-benchmark: extracción de atributos #EXTINF.
+
+Compara el método anterior (tres re.search sin compilar por línea), el mismo
+método aplicado a todos los atributos y el tokenizador compilado de un solo
+recorrido de playlist_manager, que conserva todos los atributos.
+
+Uso:
+    python benchmarks/bench_extinf.py [número_de_líneas]
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playlist_manager import parse_extinf_attributes
+
+
+def make_lines(count):
+    return [
+        f'#EXTINF:-1 tvg-id="canal{i}.es" tvg-name="Canal {i}" tvg-logo="http://logos.example.com/{i}.png" '
+        f'group-title="Grupo {i % 50}" catchup="default" catchup-days="3",Canal {i}'
+        for i in range(count)
+    ]
+
+
+def three_regex(lines):
+    # Método anterior de load_playlist
+    for line in lines:
+        name_match = re.search('tvg-name="([^"]*)"', line)
+        group_match = re.search('group-title="([^"]*)"', line)
+        logo_match = re.search('tvg-logo="([^"]*)"', line)
+        name = name_match.group(1) if name_match else ''
+        group = group_match.group(1) if group_match else 'Sin Grupo'
+        logo = logo_match.group(1) if logo_match else None
+
+
+def regex_per_attribute(lines):
+    # Método anterior ampliado a todos los atributos de la línea
+    keys = ('tvg-id', 'tvg-name', 'tvg-logo', 'group-title', 'catchup', 'catchup-days')
+    for line in lines:
+        attributes = {}
+        for key in keys:
+            match = re.search(key + '="([^"]*)"', line)
+            if match:
+                attributes[key] = match.group(1)
+
+
+def single_scan(lines):
+    for line in lines:
+        attributes = parse_extinf_attributes(line)
+        name = attributes.get('tvg-name', '')
+        group = attributes.get('group-title', 'Sin Grupo')
+        logo = attributes.get('tvg-logo')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lines = make_lines(count)
+    cases = (
+        ('3 re.search (3 atributos)', three_regex),
+        ('re.search (6 atributos)', regex_per_attribute),
+        ('tokenizador (6 atributos)', single_scan),
+    )
+    for label, func in cases:
+        best = min(timeit.repeat(lambda: func(lines), number=1, repeat=5))
+        print(f'{label:>26}: {best:.3f}s  ({count / best:,.0f} líneas/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Medición de memoria de PlaylistManager con una lista sintética grande.
+
+Genera una lista M3U sintética (benchmarks/synthetic.py) con el número de
+canales indicado, la carga con PlaylistManager.load_playlist, simula el
+resultado de una verificación y muestra la memoria ocupada por los canales
+según tracemalloc.
+
+Uso:
+    python benchmarks/bench_memory.py [número_de_canales]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playlist_manager import PlaylistManager
+from synthetic import write_playlist
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lista.m3u')
+        write_playlist(path, count)
+
+        # Trabajar en el directorio temporal para no cargar el last_playlist.json del usuario
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            manager = PlaylistManager()
+            tracemalloc.start()
+            manager.load_playlist(path)
+            for i, channel in enumerate(manager.channels):
+                channel.status = 'online' if i % 3 else 'offline'
+                channel.response_time = 0.25
+                channel.last_check = time.time()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.chdir(cwd)
+
+    print(f'Canales: {len(manager.channels):,}')
+    print(f'Memoria ocupada: {current / 2**20:.1f} MiB ({current / max(len(manager.channels), 1):.0f} bytes/canal)')
+    print(f'Pico durante la carga: {peak / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
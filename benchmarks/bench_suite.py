@@ -0,0 +1,168 @@
+"""Benchmark de carga, guardado y verificación de PlaylistManager.
+
+Genera una lista sintética (benchmarks/synthetic.py) y mide:
+
+- load: velocidad de análisis de load_playlist (canales/s y MiB/s).
+- memory: memoria ocupada por los canales y pico durante la carga (tracemalloc).
+- save_m3u / save_last: tiempo de save_m3u_playlist y save_last_playlist.
+- check: canales verificados por segundo con check_all_channels contra el
+  servidor local de streams, sin acceso a la red.
+
+Con --json se guardan los resultados; con --baseline se comparan con los de
+una ejecución anterior con los mismos argumentos, y el programa termina con
+código 1 si alguna medida empeora más de --tolerance.
+
+Uso:
+    python benchmarks/bench_suite.py [--channels 200000] [--check-channels 2000] [--json resultados.json]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playlist_manager import PlaylistManager, CHECK_MODES
+from synthetic import DEFAULT_MIX, StreamServer, parse_mix, write_playlist
+
+# Medidas en las que un valor mayor es mejor; en el resto, menor es mejor
+HIGHER_IS_BETTER = ('load_channels_per_s', 'load_mib_per_s', 'check_channels_per_s')
+
+
+@contextlib.contextmanager
+def quiet():
+    """Oculta los mensajes de PlaylistManager durante la medida."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_load_and_save(tmp, args):
+    path = os.path.join(tmp, 'lista.m3u')
+    write_playlist(path, args.channels, args.groups, args.malformed)
+    size = os.path.getsize(path)
+    manager = PlaylistManager(last_playlist_path=os.path.join(tmp, 'last_playlist.json'))
+
+    with quiet():
+        load_seconds, _ = timed(manager.load_playlist, path)
+    channels = len(manager.channels)
+    for i, channel in enumerate(manager.channels):
+        channel.status = 'online' if i % 3 else 'offline'
+        channel.response_time = 0.25
+        channel.last_check = time.time()
+    save_m3u_seconds, _ = timed(manager.save_m3u_playlist, os.path.join(tmp, 'guardada.m3u'))
+    save_last_seconds, _ = timed(manager.save_last_playlist)
+
+    # La memoria se mide en una segunda carga: tracemalloc ralentiza el análisis
+    manager.clear_channels()
+    tracemalloc.start()
+    with quiet():
+        manager.load_playlist(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'channels': channels,
+        'groups': len(manager.groups),
+        'load_seconds': round(load_seconds, 3),
+        'load_channels_per_s': round(channels / load_seconds),
+        'load_mib_per_s': round(size / 2**20 / load_seconds, 1),
+        'memory_mib': round(current / 2**20, 1),
+        'memory_peak_mib': round(peak / 2**20, 1),
+        'save_m3u_seconds': round(save_m3u_seconds, 3),
+        'save_last_seconds': round(save_last_seconds, 3),
+    }
+
+
+def bench_check(tmp, args):
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    with StreamServer(mix, ports=args.ports, latency=args.latency) as server:
+        path = os.path.join(tmp, 'verificar.m3u')
+        write_playlist(path, args.check_channels, args.groups, url_for=server.url)
+        manager = PlaylistManager(last_playlist_path=os.path.join(tmp, 'last_playlist_check.json'))
+        manager.check_mode = args.mode
+        with quiet():
+            manager.load_playlist(path)
+            start = time.perf_counter()
+            asyncio.run(manager.check_all_channels(force=True))
+            seconds = time.perf_counter() - start
+        # Estado obtenido por cada tipo de canal, para detectar cambios de comportamiento
+        outcomes = Counter(f'{server.kind(i)}:{channel.status}' for i, channel in enumerate(manager.channels))
+    return {
+        'check_mode': args.mode,
+        'check_channels': len(manager.channels),
+        'check_seconds': round(seconds, 3),
+        'check_channels_per_s': round(len(manager.channels) / seconds),
+        'check_concurrency': manager.last_check_concurrency,
+        'check_outcomes': dict(sorted(outcomes.items())),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Devuelve las medidas que empeoran más de tolerance respecto a baseline."""
+    regressions = []
+    for key, value in results.items():
+        old = baseline.get(key)
+        if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        if not (key in HIGHER_IS_BETTER or key.endswith(('_seconds', '_mib'))):
+            continue
+        change = (value - old) / old
+        worse = -change if key in HIGHER_IS_BETTER else change
+        if worse > tolerance:
+            regressions.append(f'{key}: {old} -> {value} ({change:+.0%})')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga, guardado y verificación de listas.')
+    parser.add_argument('--channels', type=int, default=200_000, help='Canales de la lista de carga')
+    parser.add_argument('--groups', type=int, default=200, help='Grupos distintos')
+    parser.add_argument('--malformed', type=float, default=0.01, help='Proporción de líneas mal formadas')
+    parser.add_argument('--check-channels', type=int, default=2000,
+                        help='Canales de la lista de verificación (0 = no verificar)')
+    parser.add_argument('--mode', choices=CHECK_MODES, default='head', help='Modo de verificación')
+    parser.add_argument('--mix', help=f"Reparto de tipos de canal, por ejemplo "
+                                      f"{','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())}")
+    parser.add_argument('--latency', type=float, default=0.02, help='Latencia del servidor local en segundos')
+    parser.add_argument('--ports', type=int, default=8, help='Puertos (servidores) del servidor local')
+    parser.add_argument('--json', help='Guardar los resultados en este archivo')
+    parser.add_argument('--baseline', help='Resultados anteriores con los que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Empeoramiento admitido (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0]}
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_load_and_save(tmp, args))
+        if args.check_channels:
+            results.update(bench_check(tmp, args))
+
+    for key, value in results.items():
+        print(f'{key:24} {value}')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('Medidas que empeoran:')
+            for line in regressions:
+                print(f'  - {line}')
+            sys.exit(1)
+        print('Sin empeoramientos respecto a la referencia')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Listas M3U sintéticas y servidor local que imita a los servidores de streams.
+
+Lo usan los benchmarks para medir sin depender de la red:
+
+- write_playlist genera una lista con el número de canales, de grupos y la
+  proporción de líneas mal formadas que se indique.
+- StreamServer arranca en otro proceso un servidor aiohttp en 127.0.0.1 que
+  responde a cada canal según el tipo codificado en su URL (ver STREAM_KINDS),
+  con la latencia indicada. Escucha en varios puertos para que los canales se
+  repartan entre varios "servidores", como en una lista real.
+
+Uso:
+    python benchmarks/synthetic.py lista.m3u [número_de_canales]
+"""
+import os
+import sys
+import random
+import asyncio
+import logging
+import multiprocessing
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import web
+
+# Comportamiento de cada tipo de canal del servidor local
+STREAM_KINDS = {
+    'ok': 'HEAD y GET responden 200 con un flujo MPEG-TS',
+    'nohead': 'HEAD responde 405; GET responde 200',
+    'notfound': 'Responde 404',
+    'error': 'Responde 500',
+    'reset': 'Cierra la conexión sin responder',
+    'slowbody': 'Cabeceras inmediatas y cuerpo enviado poco a poco',
+    'slow': 'Responde 200 tras slow_delay segundos',
+    'hls': 'Lista HLS de medios con segmentos MPEG-TS',
+}
+
+# Reparto por defecto de los tipos de canal en las listas sintéticas
+DEFAULT_MIX = {'ok': 70, 'nohead': 10, 'notfound': 8, 'error': 4, 'reset': 4, 'slowbody': 4}
+
+# Paquete MPEG-TS vacío (byte de sincronización 0x47 y relleno)
+TS_PACKET = b'\x47\x1f\xff\x10' + b'\xff' * 184
+
+# Líneas mal formadas que aparecen en listas reales
+MALFORMED_LINES = (
+    '#EXTINF:-1 tvg-name="Sin URL" group-title="Rotos",Sin URL',
+    'esto no es una directiva ni una URL',
+    '#EXTINF:-1 tvg-name="Comillas sin cerrar group-title=Rotos,Comillas',
+    '#EXTVLCOPT:http-user-agent=Mozilla/5.0',
+    '',
+)
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Convierte 'ok=70,reset=5' en {'ok': 70, 'reset': 5}."""
+    mix = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in STREAM_KINDS:
+            raise ValueError(f"Tipo de canal desconocido: {kind} (válidos: {', '.join(STREAM_KINDS)})")
+        mix[kind] = int(weight or 1)
+    return mix
+
+
+def write_playlist(path: str, count: int, groups: int = 200, malformed_ratio: float = 0.0,
+                   url_for: Optional[Callable[[int], str]] = None, seed: int = 0) -> None:
+    """Escribe una lista M3U sintética.
+
+    Args:
+        path: Ruta del archivo a crear.
+        count: Número de canales.
+        groups: Número de grupos distintos.
+        malformed_ratio: Proporción de líneas mal formadas o URLs sin metadatos
+            que se intercalan, respecto al número de canales.
+        url_for: Devuelve la URL del canal i. Por defecto, URLs de
+            example.com que no se resuelven.
+        seed: Semilla para que la lista sea la misma en cada ejecución.
+    """
+    rng = random.Random(seed)
+    if url_for is None:
+        def url_for(i):
+            return f'http://stream{i % 20}.example.com:8080/live/user/pass/{i}.ts'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U\n')
+        for i in range(count):
+            if malformed_ratio and rng.random() < malformed_ratio:
+                if rng.random() < 0.2:
+                    # URL sin #EXTINF: el cargador genera sus metadatos
+                    f.write(f'{url_for(i)}\n')
+                else:
+                    f.write(f'{rng.choice(MALFORMED_LINES)}\n')
+            f.write(f'#EXTINF:-1 tvg-id="canal{i}.es" tvg-name="Canal {i}" '
+                    f'tvg-logo="http://logos.example.com/{i}.png" group-title="Grupo {i % groups}" '
+                    f'catchup="default",Canal {i}\n')
+            f.write(f'{url_for(i)}\n')
+
+
+class _StreamHandler:
+    def __init__(self, latency: float, slow_delay: float, body_bytes: int, chunk_delay: float):
+        self.latency = latency
+        self.slow_delay = slow_delay
+        self.body = TS_PACKET * max(1, body_bytes // len(TS_PACKET))
+        self.chunk_delay = chunk_delay
+
+    async def stream(self, request: web.Request) -> web.StreamResponse:
+        kind = request.match_info['kind']
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if kind == 'reset':
+            request.transport.close()
+            raise ConnectionResetError()
+        if kind == 'notfound':
+            return web.Response(status=404)
+        if kind == 'error':
+            return web.Response(status=500)
+        if kind == 'nohead' and request.method == 'HEAD':
+            return web.Response(status=405)
+        if kind == 'slow':
+            await asyncio.sleep(self.slow_delay)
+        if kind == 'hls':
+            return web.Response(text=self._hls_playlist(request), content_type='application/vnd.apple.mpegurl')
+        if request.method == 'HEAD':
+            return web.Response(content_type='video/mp2t')
+        if kind == 'slowbody':
+            response = web.StreamResponse(headers={'Content-Type': 'video/mp2t'})
+            await response.prepare(request)
+            for start in range(0, len(self.body), len(TS_PACKET) * 4):
+                await response.write(self.body[start:start + len(TS_PACKET) * 4])
+                await asyncio.sleep(self.chunk_delay)
+            await response.write_eof()
+            return response
+        return web.Response(body=self.body, content_type='video/mp2t')
+
+    @staticmethod
+    def _hls_playlist(request: web.Request) -> str:
+        name = request.match_info['name'].rsplit('.', 1)[0]
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:6', '#EXT-X-MEDIA-SEQUENCE:0']
+        for n in range(3):
+            lines += ['#EXTINF:6.0,', f'/ok/{name}_{n}.ts']
+        return '\n'.join(lines) + '\n'
+
+
+async def _serve(ports: int, handler_args: Dict, queue) -> None:
+    handler = _StreamHandler(**handler_args)
+    app = web.Application()
+    app.router.add_route('*', '/{kind}/{name}', handler.stream)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    addresses = []
+    for _ in range(ports):
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        addresses.append(site._server.sockets[0].getsockname()[1])
+    queue.put(addresses)
+    await asyncio.Event().wait()
+
+
+def _run_server(ports: int, handler_args: Dict, queue) -> None:
+    # Las conexiones cerradas a propósito ('reset') no son errores del servidor
+    logging.getLogger('aiohttp').setLevel(logging.CRITICAL)
+    asyncio.run(_serve(ports, handler_args, queue))
+
+
+class StreamServer:
+    """Servidor local de streams de prueba, en su propio proceso.
+
+    Se usa como gestor de contexto; url(i) devuelve la URL del canal i según
+    el reparto de tipos de mix.
+
+    Args:
+        mix: Peso de cada tipo de STREAM_KINDS.
+        ports: Número de puertos (servidores distintos para el verificador).
+        latency: Segundos de espera antes de cada respuesta.
+        slow_delay: Espera adicional de los canales 'slow'.
+        body_bytes: Tamaño del cuerpo de las respuestas GET.
+        chunk_delay: Espera entre fragmentos de los canales 'slowbody'.
+        seed: Semilla del reparto de tipos.
+    """
+
+    def __init__(self, mix: Optional[Dict[str, int]] = None, ports: int = 8, latency: float = 0.0,
+                 slow_delay: float = 2.5, body_bytes: int = 64 * 1024, chunk_delay: float = 0.05,
+                 seed: int = 0):
+        self.mix = mix or DEFAULT_MIX
+        self.ports = ports
+        self.handler_args = {'latency': latency, 'slow_delay': slow_delay,
+                             'body_bytes': body_bytes, 'chunk_delay': chunk_delay}
+        self.seed = seed
+        self.addresses: List[int] = []
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> 'StreamServer':
+        queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_run_server, daemon=True,
+                                                args=(self.ports, self.handler_args, queue))
+        self._process.start()
+        self.addresses = queue.get(timeout=30)
+        kinds = list(self.mix)
+        self._kinds = random.Random(self.seed).choices(kinds, weights=[self.mix[k] for k in kinds], k=4096)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def kind(self, i: int) -> str:
+        return self._kinds[i % len(self._kinds)]
+
+    def url(self, i: int) -> str:
+        kind = self.kind(i)
+        extension = 'm3u8' if kind == 'hls' else 'ts'
+        return f'http://127.0.0.1:{self.addresses[i % len(self.addresses)]}/{kind}/{i}.{extension}'
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    write_playlist(sys.argv[1], count, malformed_ratio=0.01)
+    print(f'Lista sintética de {count:,} canales guardada en {os.path.abspath(sys.argv[1])}')
+
+
+if __name__ == '__main__':
+    main()
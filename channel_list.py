@@ -0,0 +1,136 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionViewItem, QApplication
+from playlist_manager import Channel
+
+# Texto y color con que se muestra cada estado de canal
+STATUS_DISPLAY = {
+    'online': ('✓ Online', QColor('green')),
+    'slow': ('⚠ Lento', QColor('orange')),
+    'offline': ('✗ Offline', QColor('red')),
+}
+UNKNOWN_STATUS_TEXT = '? Desconocido'
+
+
+def display_state(channel: Channel) -> Tuple[str, Optional[float]]:
+    """Lo que ChannelItemDelegate muestra del resultado de un canal: estado y tiempo redondeado."""
+    response_time = channel.response_time
+    return channel.status, round(response_time, 2) if response_time is not None else None
+
+
+class ChannelListModel(QAbstractListModel):
+    """Modelo de la lista de canales.
+
+    Guarda una copia de la lista de canales del grupo mostrado (solo las
+    referencias a los canales); la vista pide los datos de las filas visibles,
+    así que cambiar de grupo no crea widgets. La copia evita que las filas
+    cambien sin aviso a la vista cuando PlaylistManager vacía o amplía su
+    lista de canales durante una carga.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._channels: List[Channel] = []
+        # id(canal) -> fila, creado la primera vez que se actualizan filas sueltas
+        self._rows: Optional[Dict[int, int]] = None
+
+    def set_channels(self, channels: List[Channel]) -> None:
+        self.beginResetModel()
+        self._channels = list(channels)
+        self._rows = None
+        self.endResetModel()
+
+    def refresh_channels(self, channels: Iterable[Channel]) -> None:
+        """Avisa a la vista de que cambiaron los datos de esos canales.
+
+        Se emite dataChanged fila a fila, así que la vista solo repinta las
+        filas visibles afectadas y conserva la selección y el desplazamiento.
+        Los canales que no están en la lista mostrada se ignoran.
+        """
+        if self._rows is None:
+            self._rows = {id(channel): row for row, channel in enumerate(self._channels)}
+        rows = self._rows
+        for channel in channels:
+            row = rows.get(id(channel))
+            if row is not None:
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+
+    def channel(self, row: int) -> Optional[Channel]:
+        if 0 <= row < len(self._channels):
+            return self._channels[row]
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._channels)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        channel = self.channel(index.row())
+        if channel is None:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return channel.name
+        if role == Qt.ItemDataRole.UserRole:
+            return channel
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return channel.url
+        return None
+
+
+class ChannelItemDelegate(QStyledItemDelegate):
+    """Dibuja nombre, estado y tiempo de respuesta de cada canal visible."""
+
+    MARGIN = 9
+    SPACING = 6
+
+    def sizeHint(self, option, index):
+        height = option.fontMetrics.height() + 2 * self.MARGIN
+        return QSize(option.rect.width(), height)
+
+    def paint(self, painter, option, index):
+        channel = index.data(Qt.ItemDataRole.UserRole)
+        if channel is None:
+            return super().paint(painter, option, index)
+
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ''
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        # Fondo, selección y foco según el estilo actual
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, opt, painter, opt.widget)
+
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        text_color = option.palette.highlightedText().color() if selected else option.palette.text().color()
+        metrics = option.fontMetrics
+        rect = option.rect.adjusted(self.MARGIN, 0, -self.MARGIN, 0)
+        align = Qt.AlignmentFlag.AlignVCenter
+
+        painter.save()
+        painter.setFont(option.font)
+
+        # Tiempo de respuesta alineado a la derecha
+        if channel.response_time is not None:
+            response_text = f'{channel.response_time:.2f}s'
+            painter.setPen(text_color if selected else QColor('gray'))
+            painter.drawText(rect, align | Qt.AlignmentFlag.AlignRight, response_text)
+            rect.setRight(rect.right() - metrics.horizontalAdvance(response_text) - self.SPACING)
+
+        status_text, status_color = STATUS_DISPLAY.get(channel.status, (UNKNOWN_STATUS_TEXT, None))
+        status_width = metrics.horizontalAdvance(status_text)
+        name_width = max(0, rect.width() - status_width - self.SPACING)
+        name = metrics.elidedText(channel.name, Qt.TextElideMode.ElideRight, name_width)
+
+        # Nombre del canal
+        painter.setPen(text_color)
+        painter.drawText(rect, align | Qt.AlignmentFlag.AlignLeft, name)
+
+        # Estado del canal a continuación del nombre
+        rect.setLeft(rect.left() + metrics.horizontalAdvance(name) + self.SPACING)
+        painter.setPen(text_color if selected or status_color is None else status_color)
+        painter.drawText(rect, align | Qt.AlignmentFlag.AlignLeft, status_text)
+        painter.restore()
@@ -0,0 +1,209 @@
+import re
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Separadores de palabras al normalizar: todo lo que no es letra o número
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+# Los términos de búsqueda con al menos esta longitud se buscan como subcadena;
+# los más cortos, como principio de palabra
+NGRAM_SIZE = 3
+
+
+def fold_text(text: str) -> str:
+    """Normaliza un texto para buscar: sin acentos, en minúsculas y con las
+    palabras separadas por un único espacio."""
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return _NON_WORD_RE.sub(' ', text.casefold()).strip()
+
+
+def _term_keys(term: str) -> List[str]:
+    """Claves del índice que debe tener un texto para contener el término."""
+    if len(term) < NGRAM_SIZE:
+        return [' ' + term]
+    return [term[i:i + NGRAM_SIZE] for i in range(len(term) - NGRAM_SIZE + 1)]
+
+
+def _text_keys(folded: str) -> set:
+    keys = set()
+    for word in folded.split():
+        keys.add(' ' + word[:1])
+        keys.add(' ' + word[:2])
+        for i in range(len(word) - NGRAM_SIZE + 1):
+            keys.add(word[i:i + NGRAM_SIZE])
+    return keys
+
+
+def _matches(term: str, padded: str) -> bool:
+    """Indica si el texto normalizado (precedido de un espacio) contiene el término."""
+    if len(term) < NGRAM_SIZE:
+        return ' ' + term in padded
+    return term in padded
+
+
+class ChannelSearchIndex:
+    """Índice de búsqueda por nombre para listas de canales grandes.
+
+    Cada canal se indexa por los trigramas de las palabras de su nombre
+    normalizado (fold_text) y por sus prefijos de una y dos letras. Una
+    consulta se divide en términos: los de tres o más caracteres deben
+    aparecer en el nombre como subcadena y los más cortos, al principio de una
+    palabra. Los candidatos salen de la lista de posiciones más corta entre las
+    claves de los términos y se confirman con el nombre normalizado, así que
+    las entradas antiguas de un canal renombrado no dan falsos positivos.
+
+    El índice sigue a una lista de canales a la que solo se añaden elementos:
+    sync indexa los canales nuevos, reindex un canal que cambió de nombre y
+    clear lo vacía cuando se sustituye la lista. Si una consulta amplía la
+    anterior (se sigue escribiendo), solo se filtran los resultados anteriores.
+    """
+
+    def __init__(self, index_groups: bool = False):
+        """
+        Args:
+            index_groups: Si es True, también se busca en el grupo del canal.
+        """
+        self.index_groups = index_groups
+        self._postings: Dict[str, array] = {}
+        # Texto normalizado de cada canal indexado, precedido de un espacio
+        self._texts: List[str] = []
+        # Un canal renombrado puede aparecer más de una vez en una misma lista de posiciones
+        self._reindexed = False
+        self._last_query: Optional[Tuple[Tuple[str, ...], Optional[str]]] = None
+        self._last_matches: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._texts.clear()
+        self._reindexed = False
+        self._last_query = None
+
+    def _channel_text(self, channel) -> str:
+        text = f'{channel.name} {channel.group or ""}' if self.index_groups else channel.name
+        return ' ' + fold_text(text)
+
+    def sync(self, channels: Sequence, limit: Optional[int] = None) -> int:
+        """Indexa los canales de channels que aún no lo están.
+
+        Args:
+            channels: La lista de canales que sigue el índice.
+            limit: Número máximo de canales a indexar en esta llamada, para
+                construir el índice por partes sin bloquear la interfaz.
+
+        Returns:
+            int: Número de canales indexados.
+        """
+        if len(channels) < len(self._texts):
+            # La lista se ha sustituido por otra más corta
+            self.clear()
+        start = len(self._texts)
+        end = len(channels) if limit is None else min(len(channels), start + limit)
+        postings = self._postings
+        for position in range(start, end):
+            text = self._channel_text(channels[position])
+            self._texts.append(text)
+            for key in _text_keys(text):
+                positions = postings.get(key)
+                if positions is None:
+                    positions = postings[key] = array('I')
+                positions.append(position)
+        if end > start:
+            self._last_query = None
+        return end - start
+
+    def reindex(self, position: int, channel) -> None:
+        """Actualiza un canal ya indexado cuyo nombre (o grupo) ha cambiado."""
+        self._last_query = None
+        if position >= len(self._texts):
+            return
+        old_text = self._texts[position]
+        text = self._channel_text(channel)
+        if text == old_text:
+            return
+        self._texts[position] = text
+        old_keys = _text_keys(old_text)
+        for key in _text_keys(text) - old_keys:
+            positions = self._postings.get(key)
+            if positions is None:
+                positions = self._postings[key] = array('I')
+            positions.append(position)
+        self._reindexed = True
+
+    def _refines_last(self, terms: Tuple[str, ...], group: Optional[str]) -> bool:
+        """Indica si los resultados de la consulta anterior contienen los de esta."""
+        if self._last_query is None:
+            return False
+        last_terms, last_group = self._last_query
+        if last_group != group or len(terms) < len(last_terms):
+            return False
+        for old, new in zip(last_terms, terms):
+            # Un término corto busca principios de palabra; ampliarlo a subcadena no restringe
+            if new != old and not (new.startswith(old) and len(old) >= NGRAM_SIZE):
+                return False
+        return True
+
+    def _candidates(self, terms: Tuple[str, ...]) -> Iterable[int]:
+        """La lista de posiciones más corta entre las claves de los términos."""
+        candidates = None
+        for term in terms:
+            for key in _term_keys(term):
+                positions = self._postings.get(key)
+                if positions is None:
+                    return ()
+                if candidates is None or len(positions) < len(candidates):
+                    candidates = positions
+        if self._reindexed:
+            return dict.fromkeys(candidates)
+        return candidates
+
+    def search(self, query: str, channels: Sequence, group: Optional[str] = None) -> Optional[List[int]]:
+        """Busca canales por nombre.
+
+        Args:
+            query: Texto a buscar.
+            channels: La lista de canales indexada (con una consulta no vacía,
+                se sincroniza antes de buscar).
+            group: Si se indica, solo canales de ese grupo.
+
+        Returns:
+            Optional[List[int]]: Posiciones en channels de los canales que
+                coinciden, primero aquellos cuyo nombre empieza por la consulta,
+                después los que tienen una palabra que empieza por el primer
+                término y al final el resto, cada bloque en el orden de la lista.
+                None si la consulta está vacía.
+        """
+        terms = tuple(fold_text(query).split())
+        if not terms:
+            return None
+        self.sync(channels)
+
+        if self._refines_last(terms, group):
+            candidates = self._last_matches
+        else:
+            candidates = self._candidates(terms)
+
+        prefix = ' ' + ' '.join(terms)
+        first_word = ' ' + terms[0]
+        texts = self._texts
+        starts, words, others = [], [], []
+        for position in candidates:
+            text = texts[position]
+            if group is not None and channels[position].group != group:
+                continue
+            if not all(_matches(term, text) for term in terms):
+                continue
+            if text.startswith(prefix):
+                starts.append(position)
+            elif first_word in text:
+                words.append(position)
+            else:
+                others.append(position)
+        matches = sorted(starts) + sorted(words) + sorted(others)
+        self._last_query = (terms, group)
+        self._last_matches = matches
+        return matches
@@ -0,0 +1,174 @@
+import json
+from typing import Dict, List, Optional
+
+
+# Límites superiores (en segundos) de los intervalos de los histogramas de tiempos
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fases de una verificación que se miden, en el orden en que ocurren
+PROBE_PHASES = ('dns', 'connect', 'tls_connect', 'ttfb', 'total')
+
+# Prefijo de las métricas en formato Prometheus
+METRICS_PREFIX = 'tv_ip_check'
+
+
+def _escape_label(value: str) -> str:
+    """Escapa el valor de una etiqueta de Prometheus (barra invertida, comillas y saltos de línea)."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Histograma de duraciones con los intervalos de HISTOGRAM_BUCKETS."""
+
+    def __init__(self):
+        # Observaciones en cada intervalo; la última posición es la de +Inf
+        self.counts: List[int] = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(HISTOGRAM_BUCKETS)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Observaciones menores o iguales que cada límite, como en Prometheus."""
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def to_dict(self) -> Dict:
+        return {'buckets': dict(zip([*map(str, HISTOGRAM_BUCKETS), '+Inf'], self.cumulative())),
+                'sum': round(self.sum, 6), 'count': self.count}
+
+    def merge(self, data: Dict) -> None:
+        previous = 0
+        for i, total in enumerate(data['buckets'].values()):
+            self.counts[i] += total - previous
+            previous = total
+        self.sum += data['sum']
+        self.count += data['count']
+
+
+class CheckMetrics:
+    """Métricas agregadas de un barrido de verificación de canales.
+
+    Reúne histogramas de la duración de cada fase de PROBE_PHASES y contadores
+    de peticiones por método, del método con que se decidió cada canal, de
+    estados resultantes y de tipos de error. Los tiempos de fase llegan en el
+    dict trace_request_ctx que rellenan los trace hooks de aiohttp de
+    playlist_manager. Se exporta como JSON (to_dict) o como texto de
+    Prometheus (to_prometheus).
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in PROBE_PHASES}
+        self.requests: Dict[str, int] = {}  # Peticiones HTTP por método
+        self.probes: Dict[str, int] = {}  # Canales por método de la última petición
+        self.statuses: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}  # Tipo de excepción -> ocurrencias
+        self.dns_cache_hits = 0
+        # Datos del barrido completo: duración, canales, concurrencia, ...
+        self.sweep: Dict[str, Optional[float]] = {}
+
+    @staticmethod
+    def _increment(counter: Dict[str, int], key: str, amount: int = 1) -> None:
+        counter[key] = counter.get(key, 0) + amount
+
+    def observe(self, timings: Dict, total: float, status: str, error: Optional[BaseException] = None) -> None:
+        """Añade una verificación.
+
+        Args:
+            timings: El trace_request_ctx de sus peticiones.
+            total: Duración de la verificación completa en segundos.
+            status: Estado en que quedó el canal.
+            error: El error que dejó el canal fuera de línea, si lo hubo.
+        """
+        self.phases['total'].observe(total)
+        if 'dns' in timings:
+            self.phases['dns'].observe(timings['dns'])
+        if 'connect' in timings:
+            phase = 'tls_connect' if timings.get('scheme') == 'https' else 'connect'
+            self.phases[phase].observe(timings['connect'])
+        if 'ttfb' in timings:
+            self.phases['ttfb'].observe(timings['ttfb'])
+        for method in timings.get('requests', ()):
+            self._increment(self.requests, method)
+        if 'method' in timings:
+            self._increment(self.probes, timings['method'])
+        self.dns_cache_hits += timings.get('dns_cache_hits', 0)
+        self._increment(self.statuses, status)
+        if error is not None:
+            self.record_error(error)
+
+    def record_error(self, error: BaseException) -> None:
+        self._increment(self.errors, type(error).__name__)
+
+    def to_dict(self) -> Dict:
+        return {
+            'sweep': self.sweep,
+            'phases': {phase: histogram.to_dict() for phase, histogram in self.phases.items()},
+            'requests': self.requests,
+            'probes': self.probes,
+            'statuses': self.statuses,
+            'errors': self.errors,
+            'dns_cache_hits': self.dns_cache_hits,
+        }
+
+    def merge(self, data: Dict) -> None:
+        """Suma las métricas de otro barrido exportadas con to_dict."""
+        for phase, histogram in data['phases'].items():
+            self.phases[phase].merge(histogram)
+        for name in ('requests', 'probes', 'statuses', 'errors'):
+            counter = getattr(self, name)
+            for key, value in data[name].items():
+                self._increment(counter, key, value)
+        self.dns_cache_hits += data['dns_cache_hits']
+
+    @staticmethod
+    def _labels(**labels: str) -> str:
+        return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + '}'
+
+    def to_prometheus(self) -> str:
+        """Las métricas en el formato de texto de Prometheus."""
+        prefix = METRICS_PREFIX
+        lines = [f'# HELP {prefix}_phase_seconds Duración de cada fase de las verificaciones.',
+                 f'# TYPE {prefix}_phase_seconds histogram']
+        for phase, histogram in self.phases.items():
+            bounds = [*map(str, HISTOGRAM_BUCKETS), '+Inf']
+            for bound, total in zip(bounds, histogram.cumulative()):
+                lines.append(f'{prefix}_phase_seconds_bucket{self._labels(phase=phase, le=bound)} {total}')
+            lines.append(f'{prefix}_phase_seconds_sum{self._labels(phase=phase)} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_phase_seconds_count{self._labels(phase=phase)} {histogram.count}')
+        counters = (
+            ('requests_total', 'Peticiones HTTP por método.', 'method', self.requests),
+            ('probes_total', 'Canales verificados por método de la petición que decidió su estado.', 'method', self.probes),
+            ('results_total', 'Canales verificados por estado resultante.', 'status', self.statuses),
+            ('errors_total', 'Errores de verificación por tipo.', 'type', self.errors),
+        )
+        for name, help_text, label, counter in counters:
+            lines += [f'# HELP {prefix}_{name} {help_text}', f'# TYPE {prefix}_{name} counter']
+            lines += [f'{prefix}_{name}{self._labels(**{label: key})} {value}' for key, value in counter.items()]
+        lines += [f'# HELP {prefix}_dns_cache_hits_total Resoluciones DNS servidas desde la caché.',
+                  f'# TYPE {prefix}_dns_cache_hits_total counter',
+                  f'{prefix}_dns_cache_hits_total {self.dns_cache_hits}']
+        for name, value in self.sweep.items():
+            if value is not None:
+                lines += [f'# TYPE {prefix}_sweep_{name} gauge', f'{prefix}_sweep_{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def save(self, file_path: str) -> None:
+        """Guarda las métricas: texto de Prometheus si la extensión es .prom, si no JSON."""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            if file_path.endswith('.prom'):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
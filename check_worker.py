@@ -0,0 +1,93 @@
+import sys
+import asyncio
+import time
+from typing import Optional
+from PyQt6.QtCore import QThread, pyqtSignal
+from playlist_manager import PlaylistManager
+from channel_list import display_state
+
+# Intervalo mínimo en segundos entre dos avisos de progreso a la interfaz (un fotograma a 30 fps)
+PROGRESS_INTERVAL = 1 / 30
+
+
+class ChannelCheckThread(QThread):
+    """Verifica los canales en un hilo con su propio bucle de eventos asyncio.
+
+    La interfaz no ejecuta el barrido ni procesa eventos desde él: recibe el
+    progreso mediante la señal progress, emitida como mucho cada
+    PROGRESS_INTERVAL segundos, y el final mediante la señal finished de QThread.
+    Con cada aviso de progreso, channels_updated envía en un solo lote las
+    posiciones de los canales cuyo estado o tiempo mostrado ha cambiado.
+    """
+
+    # Canales verificados y total de canales a verificar
+    progress = pyqtSignal(int, int)
+    # Posiciones en playlist_manager.channels de los canales que han cambiado
+    channels_updated = pyqtSignal(list)
+    # Mensaje de un error que interrumpió la verificación
+    check_failed = pyqtSignal(str)
+
+    def __init__(self, playlist_manager: PlaylistManager, force: bool = False, parent=None):
+        super().__init__(parent)
+        self.playlist_manager = playlist_manager
+        self.force = force
+        # Se verifican exactamente los canales mostrados como pendientes al crear el hilo
+        self.pending = playlist_manager.channels_to_check(force)
+        self.total = len(self.pending)
+        self.completed = 0
+        # Lo que muestra la lista de cada canal pendiente, para avisar solo de los que cambian
+        channels = playlist_manager.channels
+        self._shown = {index: display_state(channels[index]) for index in self.pending}
+        self._changed = []
+        self.was_cancelled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_report = 0.0
+
+    def run(self):
+        # En Windows el bucle basado en select evita errores de conexión de aiohttp
+        if sys.platform.startswith('win'):
+            loop = asyncio.SelectorEventLoop()
+        else:
+            loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            self._task = loop.create_task(self._check())
+            loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            self.was_cancelled = True
+            print("Verificación de canales cancelada por el usuario")
+        except Exception as e:
+            print(f"Error al ejecutar verificación de canales: {str(e)}")
+            self.check_failed.emit(str(e))
+        finally:
+            self._loop = None
+            loop.close()
+            self._emit_progress()
+
+    def cancel(self) -> None:
+        """Cancela la verificación en curso desde cualquier hilo."""
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    async def _check(self):
+        async for result in self.playlist_manager.iter_check(indices=self.pending):
+            self.completed = result.completed
+            state = display_state(result.channel)
+            if self._shown.pop(result.index, None) != state:
+                self._changed.append(result.index)
+            self._report_progress()
+
+    def _report_progress(self) -> None:
+        now = time.monotonic()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            self._emit_progress()
+
+    def _emit_progress(self) -> None:
+        if self._changed:
+            changed, self._changed = self._changed, []
+            self.channels_updated.emit(changed)
+        self.progress.emit(self.completed, self.total)
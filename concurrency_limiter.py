@@ -0,0 +1,167 @@
+import asyncio
+import itertools
+import statistics
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limitador de concurrencia AIMD para las verificaciones de canales.
+
+    Funciona como un semáforo cuyo límite se ajusta con los resultados: tras
+    cada ventana de verificaciones sin problemas en la que se llegó a ocupar
+    todo el límite, este crece (un 50% hasta la primera congestión y después
+    de uno en uno), y cuando aumentan los tiempos de espera agotados o la
+    latencia se dispara respecto a la mejor observada, se reduce a la mitad de
+    la concurrencia que realmente hubo. Si algo limita antes las verificaciones
+    (por ejemplo, el límite por servidor), el límite no crece por encima de lo
+    que se usa. El límite siempre queda entre min_limit y max_limit.
+
+    Cada ventana está formada por las primeras verificaciones que empiezan con
+    el límite vigente y se evalúa cuando han terminado todas, también las más
+    lentas, para no juzgar la latencia solo por las que terminan antes.
+    """
+
+    def __init__(self, min_limit: int = 4, max_limit: int = 200, initial_limit: int = 50,
+                 timeout_threshold: float = 0.1, latency_factor: float = 2.0,
+                 backoff_factor: float = 0.5):
+        """
+        Args:
+            min_limit: Concurrencia mínima.
+            max_limit: Concurrencia máxima.
+            initial_limit: Concurrencia inicial.
+            timeout_threshold: Proporción de tiempos agotados en una ventana a
+                partir de la cual se reduce el límite.
+            latency_factor: Cuántas veces puede crecer la latencia mediana de
+                una ventana respecto a la mejor observada antes de reducir.
+            backoff_factor: Factor por el que se multiplica el límite al reducir.
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self.timeout_threshold = timeout_threshold
+        self.latency_factor = latency_factor
+        self.backoff_factor = backoff_factor
+        self.peak_limit = self.limit
+        self.decreases = 0
+        self._slow_start = True
+        self._in_flight = 0
+        # Máximo de plazas ocupadas a la vez durante la ventana actual y en todo el barrido
+        self._window_peak = 0
+        self.peak_in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._baseline_latency: Optional[float] = None
+        # Plazas ocupadas: identificador -> (pertenece a la ventana actual, instante de inicio)
+        self._tokens = itertools.count()
+        self._started: Dict[int, Tuple[bool, float]] = {}
+        self._window_size = 0
+        self._window_started = 0
+        self._latencies: List[float] = []
+        self._timeouts = 0
+        self._new_window()
+        # Concurrencia alcanzada en cada ventana, para informar del valor en que se estabilizó
+        self._history: List[int] = []
+
+    @property
+    def settled_limit(self) -> int:
+        """Concurrencia en torno a la que se estabilizó el barrido (mediana de las últimas ventanas).
+
+        Es la concurrencia que realmente se alcanzó, que puede ser menor que el límite.
+        """
+        if not self._history:
+            return self.peak_in_flight or self.limit
+        return int(statistics.median(self._history[-10:]))
+
+    async def acquire(self) -> int:
+        """Espera una plaza libre.
+
+        Returns:
+            int: Identificador de la plaza, que debe pasarse a release().
+        """
+        while self._in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                # Ceder el turno si ya se nos había despertado
+                self._wake_waiters()
+                raise
+        self._in_flight += 1
+        if self._in_flight > self._window_peak:
+            self._window_peak = self._in_flight
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        sampled = self._window_started < self._window_size
+        if sampled:
+            self._window_started += 1
+        token = next(self._tokens)
+        self._started[token] = (sampled, time.monotonic())
+        return token
+
+    def release(self, token: int, timed_out: bool = False) -> None:
+        """Libera una plaza y registra el resultado de la verificación.
+
+        Args:
+            token: Valor devuelto por acquire().
+            timed_out: True si la verificación terminó por tiempo agotado o por
+                una conexión cortada, señales de saturación.
+        """
+        self._in_flight -= 1
+        sampled, start = self._started.pop(token)
+        if sampled:
+            if timed_out:
+                self._timeouts += 1
+            else:
+                self._latencies.append(time.monotonic() - start)
+            if len(self._latencies) + self._timeouts >= self._window_size:
+                self._adjust()
+        self._wake_waiters()
+
+    def _new_window(self) -> None:
+        self._window_size = max(self.limit // 2, 8)
+        self._window_started = 0
+        self._window_peak = self._in_flight
+        self._latencies = []
+        self._timeouts = 0
+
+    def _adjust(self) -> None:
+        samples = len(self._latencies) + self._timeouts
+        timeout_ratio = self._timeouts / samples
+        median_latency = statistics.median(self._latencies) if self._latencies else None
+
+        congested = timeout_ratio > self.timeout_threshold
+        if median_latency is not None:
+            if self._baseline_latency is None or median_latency < self._baseline_latency:
+                self._baseline_latency = median_latency
+            # Ignorar variaciones pequeñas en latencias de pocos milisegundos
+            elif (median_latency > self._baseline_latency * self.latency_factor
+                  and median_latency - self._baseline_latency > 0.25):
+                congested = True
+
+        # Concurrencia que se usó de verdad en la ventana
+        used = min(self._window_peak, self.limit)
+        if congested:
+            self.limit = max(self.min_limit, int(used * self.backoff_factor))
+            self._slow_start = False
+            self.decreases += 1
+        elif used < self.limit:
+            # No faltaron plazas: un límite mayor no se usaría
+            pass
+        elif self._slow_start:
+            self.limit = min(self.max_limit, int(self.limit * 1.5))
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+        self.peak_limit = max(self.peak_limit, self.limit)
+        self._history.append(used)
+        self._new_window()
+
+    def _wake_waiters(self) -> None:
+        free = self.limit - self._in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
@@ -1,16 +1,30 @@
 import re
+import codecs
+import hashlib
 import json
 import os
 import tempfile
 import ssl
-from dataclasses import dataclass, asdict
-from typing import List, Optional, Dict, Literal, Tuple
+import sys
+import time
+import uuid
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from typing import List, Optional, Dict, Literal, Tuple, Iterable, Iterator, AsyncIterator, TextIO, Callable
 import asyncio
 import aiohttp
+from concurrency_limiter import AdaptiveConcurrencyLimiter
+from check_metrics import CheckMetrics
+from channel_search import ChannelSearchIndex
 from datetime import datetime
 import urllib.parse
+from array import array
 
-@dataclass
+# En Python 3.10+ los canales se guardan sin __dict__ por instancia
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_SLOTS)
 class Channel:
     name: str
     url: str
@@ -18,160 +32,1246 @@ class Channel:
     logo: Optional[str] = None
     status: Literal['unknown', 'online', 'slow', 'offline'] = 'unknown'
     response_time: Optional[float] = None
-    last_check: Optional[str] = None
+    last_check: Optional[float] = None  # Marca de tiempo (time.time()) de la última verificación
+    attributes: Optional[Dict[str, str]] = None  # Atributos #EXTINF sin campo propio (tvg-id, catchup, ...)
+    connect_time: Optional[float] = None  # Segundos en abrir la conexión (modo de verificación 'content')
+    ttfb: Optional[float] = None  # Segundos hasta el primer byte del contenido (modo 'content')
+
+URL_PREFIXES = ('http://', 'https://', 'rtsp://', 'rtmp://', 'mmsh://')
+
+# Todos los pares clave="valor" de una línea #EXTINF en un único recorrido. La clave
+# puede ir tras cualquier carácter que no forme parte de ella (espacio, tabulador,
+# coma, comillas de cierre del atributo anterior, ...)
+EXTINF_ATTRIBUTE_RE = re.compile(r'(?<![\w-])([\w-]+)="([^"]*)"')
+
+# Lo mismo solo para claves precedidas de un espacio, el caso habitual, que es
+# bastante más rápido de buscar
+_SPACED_EXTINF_ATTRIBUTE_RE = re.compile(r' ([\w-]+)="([^"]*)"')
+
+# Atributos que genera save_m3u_playlist a partir de los campos del resultado de verificación
+_CHECK_RESULT_ATTRIBUTES = ('tvg-status', 'tvg-response-time', 'tvg-last-check')
+
+
+def parse_extinf_attributes(line: str) -> Dict[str, str]:
+    """Extrae todos los atributos clave="valor" de una línea #EXTINF.
+
+    Las claves se internan para que todos los canales compartan las mismas
+    cadenas. Si un atributo aparece repetido se conserva la primera aparición.
+    """
+    pairs = _SPACED_EXTINF_ATTRIBUTE_RE.findall(line)
+    if len(pairs) != line.count('="'):
+        # Algún atributo no va precedido de un espacio
+        pairs = EXTINF_ATTRIBUTE_RE.findall(line)
+    intern = sys.intern
+    attributes = {intern(key): value for key, value in pairs}
+    if len(attributes) != len(pairs):
+        # Hay claves repetidas: el dict se habría quedado con la última
+        attributes = {}
+        for key, value in pairs:
+            attributes.setdefault(intern(key), value)
+    return attributes
+
+
+class M3UParser:
+    """Analizador M3U incremental.
+
+    Recibe las líneas de una en una mediante feed() y devuelve cada canal en
+    cuanto su URL está disponible, sin guardar el archivo completo en memoria.
+    Las URLs sin línea #EXTINF reciben metadatos generados; si se indica
+    processed_file, la lista completada se escribe en él a medida que avanza.
+    Con open_processed_file, en cambio, no se escribe nada hasta la primera URL
+    sin metadatos: entonces se llama para obtener el archivo, que debe contener
+    ya las líneas anteriores, y a partir de ahí se escribe como con processed_file.
+    """
+
+    def __init__(self, processed_file: Optional[TextIO] = None,
+                 open_processed_file: Optional[Callable[[], Optional[TextIO]]] = None):
+        self.processed_file = processed_file
+        self.needs_processing = False
+        self.line_number = 0
+        self.channel_count = 0
+        self._generated_count = 1
+        self._current_channel: Optional[Channel] = None
+        self._awaiting_url = False
+        self._open_processed_file = open_processed_file
+        if processed_file is not None:
+            processed_file.write('#EXTM3U\n')
+
+    def _write(self, line: str) -> None:
+        if self.processed_file is not None:
+            self.processed_file.write(line + '\n')
+
+    def _parse_extinf(self, line: str) -> Channel:
+        # Extraer nombre y metadatos del canal; lo que queda en attributes son los atributos extra
+        attributes = parse_extinf_attributes(line)
+        pop = attributes.pop
+        
+        name = pop('tvg-name', '')
+        if not name:
+            # Buscar el nombre al final de la línea
+            name = line.split(',')[-1].strip()
+            if not name:
+                name = f'Canal {self.channel_count + 1}'
+        
+        group = sys.intern(pop('group-title', 'Sin Grupo'))
+        logo = pop('tvg-logo', None)
+        for key in _CHECK_RESULT_ATTRIBUTES:
+            if key in attributes:
+                del attributes[key]
+        
+        return Channel(name=name, url='', group=group, logo=logo, attributes=attributes or None)
+
+    def _finish_channel(self, url: str) -> Channel:
+        channel = self._current_channel
+        self._current_channel = None
+        # Validar la URL antes de asignarla
+        parsed_url = urllib.parse.urlparse(url)
+        if not parsed_url.scheme or not parsed_url.netloc:
+            print(f"URL malformada en línea {self.line_number}: {url}")
+            channel.status = 'offline'
+        channel.url = url
+        self.channel_count += 1
+        return channel
+
+    def feed(self, raw_line: str) -> Optional[Channel]:
+        """Procesa una línea y devuelve el canal completado por ella, si lo hay."""
+        self.line_number += 1
+        line = raw_line.strip()
+        if not line:
+            return None
+        
+        try:
+            if line.startswith('#EXTINF'):
+                self._write(line)
+                self._current_channel = self._parse_extinf(line)
+                self._awaiting_url = True
+                return None
+            
+            if self._awaiting_url:
+                # Entre #EXTINF y la URL pueden aparecer otras directivas (#EXTVLCOPT, ...)
+                self._write(line)
+                if line.startswith('#'):
+                    return None
+                self._awaiting_url = False
+                if line.startswith(URL_PREFIXES):
+                    return self._finish_channel(line)
+                return None
+            
+            if line.startswith(URL_PREFIXES):
+                # URL sin metadatos: crearlos
+                self.needs_processing = True
+                if self._open_processed_file is not None:
+                    self.processed_file = self._open_processed_file()
+                    self._open_processed_file = None
+                name = f'Canal {self._generated_count}'
+                self._write(f'#EXTINF:-1 tvg-name="{name}" group-title="Sin Grupo" tvg-status="online",{name}')
+                self._write(line)
+                self._generated_count += 1
+                self._current_channel = Channel(name=name, url='', group='Sin Grupo')
+                return self._finish_channel(line)
+            
+            if not line.startswith('#EXTM3U'):
+                self._write(line)
+        except Exception as line_error:
+            print(f"Error procesando línea {self.line_number}: {line}")
+            print(f"Detalle del error: {str(line_error)}")
+        return None
+
+
+def iter_m3u_channels(lines: Iterable[str], processed_file: Optional[TextIO] = None) -> Iterator[Channel]:
+    """Genera los canales de una lista M3U en una sola pasada.
+
+    Args:
+        lines: Cualquier iterable de líneas, por ejemplo un archivo abierto.
+        processed_file: Archivo opcional donde escribir la lista con los
+            metadatos faltantes completados.
+
+    Yields:
+        Channel: Cada canal en el orden en que aparece en la lista.
+    """
+    parser = M3UParser(processed_file)
+    for line in lines:
+        channel = parser.feed(line)
+        if channel is not None:
+            yield channel
+
+LAST_PLAYLIST_VERSION = 2
+
+# Orden de los campos en cada registro de canal del archivo guardado
+CHANNEL_FIELDS = [f.name for f in fields(Channel)]
+
+# Cada cuántos canales verificados se escriben los resultados durante una verificación
+CHECK_RESULTS_BATCH = 500
+
+# Segundos durante los que el resultado de una verificación sigue vigente, por estado.
+# check_all_channels no vuelve a verificar los canales con un resultado vigente.
+DEFAULT_CHECK_TTL = {'online': 30 * 60, 'slow': 10 * 60, 'offline': 5 * 60}
+
+# Errores que indican saturación de la red y hacen reducir la concurrencia
+CONGESTION_ERRORS = (asyncio.TimeoutError, ConnectionResetError, aiohttp.ServerDisconnectedError)
+
+# Cómo verifica check_channel cada canal: 'head' acepta cualquier respuesta 200
+# (HEAD y, si falla, GET); 'content' lee como mucho probe_max_bytes del cuerpo y
+# exige que empiecen como un stream de vídeo o audio (detect_media_signature).
+# 'hls' es como 'content', pero las listas HLS se siguen hasta un segmento
+# (_check_hls_stream) y el caudal medido decide si el canal es lento.
+CHECK_MODES = ('head', 'content', 'hls')
+
+# Segundos de respuesta a partir de los que un canal se marca como lento
+SLOW_RESPONSE_TIME = 2.0
+
+# Bytes que bastan para reconocer el formato del contenido (tres paquetes MPEG-TS)
+MEDIA_SIGNATURE_BYTES = 3 * 188
+
+# Bytes que se leen como mucho de cada lista HLS (maestra o de medios) en el modo 'hls'
+HLS_MANIFEST_MAX_BYTES = 256 * 1024
+
+# Proporción del BANDWIDTH declarado que debe alcanzar el caudal medido de un segmento
+HLS_REALTIME_RATIO = 1.0
+
+# Atributo BANDWIDTH de #EXT-X-STREAM-INF (no AVERAGE-BANDWIDTH)
+HLS_BANDWIDTH_RE = re.compile(r'[:,]BANDWIDTH=(\d+)')
+
+# Segundos que se reutiliza una resolución DNS entre verificaciones
+DNS_CACHE_TTL = 600
+
+# Cómo resuelve merge_playlists los metadatos de un canal repetido:
+# 'first' conserva los del primero, 'last' toma los del último y 'fill'
+# conserva los del primero completando los que le falten con los del nuevo.
+MERGE_POLICIES = ('first', 'last', 'fill')
+
+# Puertos que normalize_channel_url omite por ser los predeterminados del esquema
+_DEFAULT_PORTS = {'http': ':80', 'https': ':443', 'rtsp': ':554', 'rtmp': ':1935'}
+
+# Intervalo mínimo en segundos entre dos llamadas a un progress_callback (20 por segundo)
+PROGRESS_INTERVAL = 0.05
+
+# Tamaño de los bloques en que se escribe y analiza una lista descargada
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Índice (en download_dir) con el ETag y Last-Modified de cada URL descargada
+DOWNLOAD_CACHE_FILE = 'download_cache.json'
+
+# Máscara de permisos del proceso: tempfile crea los archivos con 0600 sin tenerla en cuenta
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+@dataclass(**_DATACLASS_SLOTS)
+class CheckResult:
+    """Resultado de un canal generado por PlaylistManager.iter_check, con los contadores del barrido."""
+    index: int  # Posición del canal en PlaylistManager.channels
+    channel: Channel
+    error: Optional[Exception]  # Error que dejó el canal fuera de línea, si lo hubo
+    completed: int  # Canales verificados hasta ahora, incluido este
+    total: int  # Canales a verificar en el barrido
+    failed: int  # Verificaciones que terminaron con una excepción
+    online: int
+    slow: int
+    offline: int
+
+class ProgressThrottle:
+    """Limita las llamadas a un progress_callback a una cada PROGRESS_INTERVAL segundos.
+
+    Llamar a la instancia invoca el callback y devuelve False si este pidió
+    cancelar devolviendo False; due() indica si ya toca informar.
+    """
+
+    def __init__(self, callback=None, interval: float = PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self._next_report = 0.0
+
+    def due(self) -> bool:
+        return self.callback is not None and time.monotonic() >= self._next_report
+
+    def __call__(self, percent: float, count: int) -> bool:
+        if self.callback is None:
+            return True
+        self._next_report = time.monotonic() + self.interval
+        return self.callback(percent, count) is not False
+
+def channel_from_dict(data: Dict) -> Channel:
+    """Reconstruye un canal a partir de sus campos guardados.
+
+    Acepta también el formato anterior, en el que last_check era una cadena ISO.
+    """
+    channel = Channel(**data)
+    if channel.group is not None:
+        channel.group = sys.intern(channel.group)
+    channel.status = sys.intern(channel.status)
+    if isinstance(channel.last_check, str):
+        try:
+            channel.last_check = datetime.fromisoformat(channel.last_check).timestamp()
+        except ValueError:
+            channel.last_check = None
+    return channel
+
+def detect_media_signature(data: bytes) -> Optional[str]:
+    """Reconoce el formato de un stream por sus primeros bytes.
+
+    Returns:
+        Optional[str]: 'mpegts', 'hls', 'flv', 'mp4' o 'audio' (MP3/AAC), o
+            None si el contenido no parece un stream (por ejemplo, una página HTML).
+    """
+    if data.startswith(b'FLV'):
+        return 'flv'
+    if data[4:8] in (b'ftyp', b'moov', b'moof', b'styp', b'sidx'):
+        return 'mp4'
+    if data.lstrip().lstrip(codecs.BOM_UTF8).startswith(b'#EXTM3U'):
+        return 'hls'
+    # MPEG-TS: byte de sincronización 0x47 cada 188 bytes, al menos dos veces
+    for offset in range(min(188, len(data) - 188)):
+        if data[offset] == 0x47 and all(data[i] == 0x47 for i in range(offset + 188, len(data), 188)):
+            return 'mpegts'
+    if data.startswith(b'ID3') or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return 'audio'
+    return None
+
+def parse_hls_playlist(text: str) -> Tuple[List[Tuple[int, str]], List[Tuple[float, str]], bool]:
+    """Extrae variantes y segmentos de una lista HLS.
+
+    Returns:
+        Tuple: (variantes como (BANDWIDTH, uri) si es una lista maestra,
+            segmentos como (duración, uri) si es una lista de medios,
+            True si los segmentos están cifrados)
+    """
+    variants: List[Tuple[int, str]] = []
+    segments: List[Tuple[float, str]] = []
+    encrypted = False
+    pending_bandwidth: Optional[int] = None
+    pending_duration: Optional[float] = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-STREAM-INF'):
+            match = HLS_BANDWIDTH_RE.search(line)
+            pending_bandwidth = int(match.group(1)) if match else 0
+        elif line.startswith('#EXTINF:'):
+            try:
+                pending_duration = float(line[8:].split(',', 1)[0])
+            except ValueError:
+                pending_duration = 0.0
+        elif line.startswith('#EXT-X-KEY') and 'METHOD=NONE' not in line:
+            encrypted = True
+        elif not line.startswith('#'):
+            if pending_bandwidth is not None:
+                variants.append((pending_bandwidth, line))
+            elif pending_duration is not None:
+                segments.append((pending_duration, line))
+            pending_bandwidth = pending_duration = None
+    return variants, segments, encrypted
+
+async def _read_limited(response: aiohttp.ClientResponse, limit: int) -> bytes:
+    """Lee el cuerpo de una respuesta hasta el final o hasta limit bytes."""
+    data = b''
+    while len(data) < limit:
+        chunk = await response.content.read(limit - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+def _probe_trace_config() -> aiohttp.TraceConfig:
+    """Mide en trace_request_ctx (un dict) las fases de las peticiones de una verificación.
+
+    Claves: 'dns' y 'connect' (segundos en resolver y en abrir conexiones,
+    incluido el TLS; ausentes si se reutilizó una del pool), 'ttfb' (hasta las
+    cabeceras de la última respuesta), 'method' y 'scheme' de la última
+    petición, 'requests' (método de cada petición) y 'dns_cache_hits'.
+    """
+    def elapsed(timings, name):
+        timings[name] = timings.get(name, 0.0) + time.monotonic() - timings.pop(f'{name}_start')
+
+    async def on_request_start(session, context, params):
+        timings = context.trace_request_ctx
+        if isinstance(timings, dict):
+            timings['request_start'] = time.monotonic()
+            timings['method'] = params.method
+            timings['scheme'] = params.url.scheme
+            timings.setdefault('requests', []).append(params.method)
+
+    async def on_request_end(session, context, params):
+        timings = context.trace_request_ctx
+        if isinstance(timings, dict) and 'request_start' in timings:
+            timings['ttfb'] = time.monotonic() - timings['request_start']
+
+    async def on_dns_resolvehost_start(session, context, params):
+        if isinstance(context.trace_request_ctx, dict):
+            context.trace_request_ctx['dns_start'] = time.monotonic()
+
+    async def on_dns_resolvehost_end(session, context, params):
+        timings = context.trace_request_ctx
+        if isinstance(timings, dict) and 'dns_start' in timings:
+            elapsed(timings, 'dns')
+
+    async def on_dns_cache_hit(session, context, params):
+        timings = context.trace_request_ctx
+        if isinstance(timings, dict):
+            timings['dns_cache_hits'] = timings.get('dns_cache_hits', 0) + 1
+
+    async def on_connection_create_start(session, context, params):
+        if isinstance(context.trace_request_ctx, dict):
+            context.trace_request_ctx['connect_start'] = time.monotonic()
+
+    async def on_connection_create_end(session, context, params):
+        timings = context.trace_request_ctx
+        if isinstance(timings, dict) and 'connect_start' in timings:
+            elapsed(timings, 'connect')
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+def _channel_host(url: str) -> str:
+    """Servidor (host:puerto) de la URL de un canal, usado para limitar la concurrencia por servidor."""
+    try:
+        return urllib.parse.urlsplit(url).netloc.rpartition('@')[2].lower()
+    except ValueError:
+        return ''
+
+def download_file_name(url: str) -> str:
+    """Nombre fijo del archivo local de una URL descargada.
+
+    Incluye un resumen de la URL completa, de modo que cada descarga de la misma
+    URL reemplaza a la anterior y dos URLs con el mismo nombre no se pisan.
+    """
+    base_name = os.path.basename(urllib.parse.urlparse(url).path)
+    stem, extension = os.path.splitext(base_name)
+    if extension.lower() not in ('.m3u', '.m3u8'):
+        # Sin nombre de archivo en la URL, o con otra extensión (.php, ...)
+        stem, extension = (base_name or 'playlist'), '.m3u'
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+    return f"{stem}_{digest}{extension}"
+
+def replace_with_temp_file(temp_path: str, path: str) -> None:
+    """Sustituye path por un archivo temporal de tempfile con los permisos de un archivo nuevo.
+
+    Antes de renombrarlo se le dan los permisos que tendría creado con open()
+    (0666 menos la umask), no los 0600 con que lo crea tempfile.
+    """
+    os.chmod(temp_path, 0o666 & ~_UMASK)
+    os.replace(temp_path, path)
+
+def decode_playlist_line(raw_line: bytes) -> str:
+    """Decodifica una línea en UTF-8 o, como en load_playlist, en latin-1 si no lo es."""
+    try:
+        return raw_line.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw_line.decode('latin-1')
+
+def normalize_channel_url(url: str) -> str:
+    """Forma canónica de una URL para detectar canales duplicados.
+
+    Pasa a minúsculas el esquema y el servidor (no el usuario ni la ruta), quita
+    el puerto por defecto del esquema y el fragmento, y usa '/' como ruta vacía.
+    """
+    url = url.strip()
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    userinfo, at, host = parts.netloc.rpartition('@')
+    host = host.lower()
+    default_port = _DEFAULT_PORTS.get(scheme)
+    if default_port and host.endswith(default_port):
+        host = host[:-len(default_port)]
+    return urllib.parse.urlunsplit((scheme, userinfo + at + host, parts.path or '/', parts.query, ''))
+
+def _index_channel(channels: List[Channel], group_index: Dict[str, array], channel: Channel) -> None:
+    positions = group_index.get(channel.group)
+    if positions is None:
+        positions = group_index[channel.group] = array('I')
+    positions.append(len(channels))
+    channels.append(channel)
+
+def _merge_channel(existing: Channel, new: Channel, policy: str) -> bool:
+    """Combina en existing los datos de un canal repetido.
+
+    Returns:
+        bool: True si cambió el grupo del canal y hay que rehacer el índice de grupos.
+    """
+    old_group = existing.group
+    if policy == 'last':
+        existing.name = new.name
+        existing.group = new.group
+        existing.logo = new.logo or existing.logo
+        if new.attributes:
+            existing.attributes = {**(existing.attributes or {}), **new.attributes}
+    elif policy == 'fill':
+        if not existing.logo:
+            existing.logo = new.logo
+        if existing.group in (None, 'Sin Grupo'):
+            existing.group = new.group
+        if new.attributes:
+            existing.attributes = {**new.attributes, **(existing.attributes or {})}
+    return existing.group != old_group
+
+# Campos de Channel que un proceso de check_all_channels_sharded devuelve por canal
+SHARD_RESULT_FIELDS = ('status', 'response_time', 'last_check', 'connect_time', 'ttfb')
+
+def _shard_by_host(channels: List[Channel], pending: List[int], workers: int) -> List[List[int]]:
+    """Reparte las posiciones pendientes en como mucho workers fragmentos sin separar servidores.
+
+    Todos los canales de un servidor van al mismo fragmento, así que un solo
+    proceso respeta el límite por servidor y reutiliza sus conexiones. Los
+    servidores se asignan de mayor a menor número de canales al fragmento
+    con menos canales, para equilibrar los procesos.
+    """
+    hosts: Dict[str, List[int]] = {}
+    for index in pending:
+        hosts.setdefault(_channel_host(channels[index].url), []).append(index)
+    shards: List[List[int]] = [[] for _ in range(min(workers, len(hosts)))]
+    for indices in sorted(hosts.values(), key=len, reverse=True):
+        min(shards, key=len).extend(indices)
+    for shard in shards:
+        shard.sort()
+    return shards
+
+def _check_shard(channels: List[Tuple[str, str]], settings: Dict) -> Tuple[List[Tuple], Optional[int], Dict]:
+    """Verifica en un proceso aparte los canales (nombre, url) de un fragmento.
+
+    Returns:
+        Tuple: (valores de SHARD_RESULT_FIELDS de cada canal, en el mismo orden;
+            concurrencia en que se estabilizó el proceso; sus métricas, CheckMetrics.to_dict)
+    """
+    manager = PlaylistManager(last_playlist_path=None)
+    for name, value in settings.items():
+        setattr(manager, name, value)
+    for name, url in channels:
+        manager.add_channel(Channel(name=name, url=url))
+    asyncio.run(manager.check_all_channels(force=True))
+    results = [tuple(getattr(channel, name) for name in SHARD_RESULT_FIELDS) for channel in manager.channels]
+    return results, manager.last_check_concurrency, manager.last_check_metrics.to_dict()
 
 class PlaylistManager:
-    def __init__(self):
-        self.channels: List[Channel] = []
-        self.groups: List[str] = []
-        self.last_playlist_path: str = 'last_playlist.json'
+    def __init__(self, lazy_restore: bool = False, last_playlist_path: Optional[str] = 'last_playlist.json'):
+        """
+        Args:
+            lazy_restore: Si es True, al iniciar solo se lee la cabecera de la
+                última lista guardada (grupos y recuentos) y los canales se cargan
+                en un hilo en segundo plano. El primer acceso a channels espera a
+                que termine la carga.
+            last_playlist_path: Archivo donde se guarda la última lista y los
+                resultados de verificación. Con None no se restaura ni se guarda nada.
+        """
+        self._channels: List[Channel] = []
+        # Grupo -> posiciones de sus canales en self.channels (en orden de aparición)
+        self._group_index: Dict[str, array] = {}
+        # Índice de búsqueda por nombre; indexa los canales nuevos al buscar (o con su método sync)
+        self.search_index = ChannelSearchIndex()
+        self._snapshot_generation: Optional[str] = None
+        self._snapshot_updates = 0
+        self._restore_thread: Optional[threading.Thread] = None
+        self._restore_header: Optional[Dict] = None
+        self._restore_result = None
+        self.last_playlist_path: Optional[str] = last_playlist_path
+        self.check_ttl: Dict[str, float] = dict(DEFAULT_CHECK_TTL)
+        # Verificaciones simultáneas como máximo contra un mismo servidor (0 = sin límite)
+        self.max_checks_per_host: int = 6
+        # Límites del control adaptativo de concurrencia de check_all_channels
+        self.min_concurrent_checks: int = 4
+        self.initial_concurrent_checks: int = 50
+        self.max_concurrent_checks: int = 200
+        # Modo de verificación (uno de CHECK_MODES) y bytes que lee como mucho el modo 'content'
+        self.check_mode: str = 'head'
+        self.probe_max_bytes: int = 4096
+        # Bytes que lee como mucho el modo 'hls' del segmento con el que mide el caudal
+        self.hls_segment_max_bytes: int = 512 * 1024
+        # Concurrencia en que se estabilizó la última verificación
+        self.last_check_concurrency: Optional[int] = None
+        # Tiempos por fase y contadores de la última verificación (o de la que está en curso)
+        self.last_check_metrics: Optional[CheckMetrics] = None
         self.download_dir: str = os.path.join(tempfile.gettempdir(), 'tv_ip_playlists')
         os.makedirs(self.download_dir, exist_ok=True)
-        self._load_last_playlist()
+        if lazy_restore:
+            self._start_lazy_restore()
+        else:
+            self._load_last_playlist()
+
+    @property
+    def channels(self) -> List[Channel]:
+        if self._restore_thread is not None:
+            self._finish_restore()
+        return self._channels
+
+    @property
+    def group_index(self) -> Dict[str, array]:
+        if self._restore_thread is not None:
+            self._finish_restore()
+        return self._group_index
+
+    @property
+    def restore_pending(self) -> bool:
+        """True mientras la carga en segundo plano de la última lista no ha terminado."""
+        return self._restore_thread is not None and self._restore_thread.is_alive()
+
+    def _read_last_playlist_header(self, f: TextIO) -> Optional[Dict]:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None
+        if not isinstance(header, dict) or header.get('version') != LAST_PLAYLIST_VERSION:
+            return None
+        return header
 
     def _load_last_playlist(self) -> None:
-        if os.path.exists(self.last_playlist_path):
+        if self.last_playlist_path and os.path.exists(self.last_playlist_path):
+            try:
+                with open(self.last_playlist_path, 'r', encoding='utf-8') as f:
+                    header = self._read_last_playlist_header(f)
+                    self.clear_channels()
+                    if header is None:
+                        # Formato anterior: un único objeto JSON con todos los canales
+                        f.seek(0)
+                        data = json.load(f)
+                        for ch in data['channels']:
+                            self.add_channel(channel_from_dict(ch))
+                        return
+                    self._install_restored(self._read_last_playlist_records(f, header))
+            except Exception as e:
+                print(f"Error loading last playlist: {e}")
+
+    def _start_lazy_restore(self) -> None:
+        if not self.last_playlist_path or not os.path.exists(self.last_playlist_path):
+            return
+        try:
+            with open(self.last_playlist_path, 'r', encoding='utf-8') as f:
+                header = self._read_last_playlist_header(f)
+        except Exception as e:
+            print(f"Error loading last playlist: {e}")
+            return
+        if header is None or not isinstance(header.get('groups'), dict):
+            # Sin cabecera no hay nada que mostrar antes de leer el archivo completo
+            self._load_last_playlist()
+            return
+        
+        def restore():
             try:
                 with open(self.last_playlist_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.channels = [Channel(**ch) for ch in data['channels']]
-                    self.groups = data['groups']
+                    f.readline()
+                    self._restore_result = self._read_last_playlist_records(f, header)
             except Exception as e:
                 print(f"Error loading last playlist: {e}")
+        
+        self._restore_header = header
+        self._restore_thread = threading.Thread(target=restore, daemon=True)
+        self._restore_thread.start()
+
+    def _finish_restore(self) -> None:
+        thread = self._restore_thread
+        if thread is None:
+            return
+        thread.join()
+        self._restore_thread = None
+        self._restore_header = None
+        if self._restore_result is not None:
+            self._install_restored(self._restore_result)
+            self._restore_result = None
+
+    def _install_restored(self, restored: Tuple) -> None:
+        self._channels, self._group_index, self._snapshot_generation, self._snapshot_updates = restored
+        self.search_index.clear()
+
+    def _read_last_playlist_records(self, f: TextIO, header: Dict) -> Tuple:
+        """Lee los registros que siguen a la cabecera sin modificar el estado del gestor.
+
+        Returns:
+            Tuple: (canales, índice de grupos, id de la instantánea, actualizaciones leídas)
+        """
+        channels: List[Channel] = []
+        group_index: Dict[str, array] = {}
+        field_names = header['fields']
+        generation = header['generation']
+        updates = 0
+        for line_number, line in enumerate(f, start=2):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Una línea incompleta al final indica una escritura interrumpida
+                print(f"Línea {line_number} de {self.last_playlist_path} ignorada: registro incompleto")
+                continue
+            if isinstance(record, list):
+                _index_channel(channels, group_index, channel_from_dict(dict(zip(field_names, record))))
+            elif record.get('g') == generation and 0 <= record['i'] < len(channels):
+                # Resultado de verificación añadido después de la instantánea
+                channel = channels[record['i']]
+                channel.status = sys.intern(record['s'])
+                channel.response_time = record['r']
+                channel.last_check = record['t']
+                updates += 1
+        return channels, group_index, generation, updates
+
+    @property
+    def groups(self) -> List[str]:
+        """Nombres de los grupos en orden de aparición."""
+        header = self._restore_header
+        if header is not None:
+            return list(header['groups'])
+        return list(self.group_index)
+
+    @property
+    def group_counts(self) -> Dict[str, int]:
+        """Número de canales de cada grupo, disponible antes de terminar la carga diferida."""
+        header = self._restore_header
+        if header is not None:
+            return dict(header['groups'])
+        return {group: len(positions) for group, positions in self.group_index.items()}
+
+    def add_channel(self, channel: Channel) -> None:
+        """Añade un canal a la lista manteniendo actualizado el índice de grupos."""
+        _index_channel(self.channels, self.group_index, channel)
+
+    def clear_channels(self) -> None:
+        self.channels.clear()
+        self.group_index.clear()
+        self.search_index.clear()
+        # La instantánea guardada ya no corresponde a la lista en memoria
+        self._snapshot_generation = None
+        self._snapshot_updates = 0
 
     def save_last_playlist(self) -> None:
+        """Guarda la lista completa de forma atómica (archivo temporal + rename).
+
+        El archivo es JSON Lines: una cabecera seguida de un registro compacto por
+        canal. save_check_results añade después los resultados de las verificaciones al final.
+        """
+        if not self.last_playlist_path:
+            return
         try:
-            data = {
-                'channels': [asdict(ch) for ch in self.channels],
-                'groups': self.groups
+            generation = uuid.uuid4().hex
+            header = {
+                'version': LAST_PLAYLIST_VERSION,
+                'generation': generation,
+                'fields': CHANNEL_FIELDS,
+                'channels': len(self.channels),
+                'groups': self.group_counts,
             }
-            with open(self.last_playlist_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            directory = os.path.dirname(os.path.abspath(self.last_playlist_path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.last_playlist_', suffix='.tmp')
+            try:
+                encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(header, ensure_ascii=False) + '\n')
+                    for ch in self.channels:
+                        f.write(encode([getattr(ch, name) for name in CHANNEL_FIELDS]) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                replace_with_temp_file(temp_path, self.last_playlist_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            self._snapshot_generation = generation
+            self._snapshot_updates = 0
         except Exception as e:
             print(f"Error saving last playlist: {e}")
 
-    async def check_channel(self, channel: Channel) -> None:
+    def save_check_results(self, indices: Iterable[int]) -> None:
+        """Añade al archivo guardado el resultado de los canales indicados.
+
+        Solo escribe una línea por canal; si la lista en memoria no tiene una
+        instantánea guardada, o se han acumulado más resultados que canales, se
+        reescribe la instantánea completa.
+        """
+        indices = list(indices)
+        if not indices or not self.last_playlist_path:
+            return
+        if self._snapshot_generation is None or not os.path.exists(self.last_playlist_path):
+            self.save_last_playlist()
+            return
+        try:
+            with open(self.last_playlist_path, 'a', encoding='utf-8') as f:
+                for i in indices:
+                    ch = self.channels[i]
+                    f.write(json.dumps({'g': self._snapshot_generation, 'i': i, 's': ch.status,
+                                        'r': ch.response_time, 't': ch.last_check},
+                                       separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._snapshot_updates += len(indices)
+        except Exception as e:
+            print(f"Error al guardar los resultados de verificación: {e}")
+            return
+        if self._snapshot_updates > len(self.channels):
+            self.save_last_playlist()
+
+    def _create_check_session(self, max_connections: int, max_per_host: int = 0) -> aiohttp.ClientSession:
+        """Crea la sesión HTTP compartida por todas las verificaciones de un barrido.
+
+        Args:
+            max_connections: Número máximo de conexiones simultáneas del pool.
+            max_per_host: Número máximo de conexiones simultáneas a un mismo
+                servidor (0 = sin límite).
+
+        Returns:
+            aiohttp.ClientSession: Sesión con pool de conexiones, keep-alive y
+                caché DNS compartida por todas las verificaciones.
+        """
+        timeout = aiohttp.ClientTimeout(total=5, connect=3)
+        # Pool de conexiones reutilizables: los canales del mismo servidor comparten sockets
+        connector = aiohttp.TCPConnector(
+            limit=max_connections,
+            limit_per_host=max_per_host,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=30,
+            enable_cleanup_closed=True,
+            ssl=False  # Ignorar verificación SSL para evitar errores con certificados autofirmados
+        )
+        return aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                     trace_configs=[_probe_trace_config()])
+
+    async def check_channel(self, channel: Channel, session: Optional[aiohttp.ClientSession] = None,
+                            timings: Optional[Dict] = None) -> Optional[Exception]:
+        """Verifica el estado de un canal.
+
+        Args:
+            channel: El canal a verificar.
+            session: Sesión HTTP compartida. Si no se indica, se crea una sesión
+                temporal solo para este canal.
+            timings: Dict en el que se anotan las fases de la verificación
+                (ver _probe_trace_config).
+
+        Returns:
+            Optional[Exception]: El error que dejó el canal fuera de línea, si lo hubo.
+        """
+        if session is None:
+            try:
+                async with self._create_check_session(1) as own_session:
+                    return await self._probe_channel(channel, own_session, timings)
+            except Exception as e:
+                print(f"Error inesperado al verificar canal {channel.name}: {str(e)}")
+                channel.status = 'offline'
+                channel.response_time = None
+                channel.last_check = time.time()
+                return e
+        return await self._probe_channel(channel, session, timings)
+
+    async def _probe_channel(self, channel: Channel, session: aiohttp.ClientSession,
+                             timings: Optional[Dict] = None) -> Optional[Exception]:
+        if self.check_mode in ('content', 'hls'):
+            return await self._probe_channel_content(channel, session, timings)
+        channel.connect_time = None
+        channel.ttfb = None
         try:
             start_time = datetime.now()
-            # Configurar el ClientSession con opciones más robustas
-            timeout = aiohttp.ClientTimeout(total=5, connect=3)
-            # Configurar el conector para ignorar errores SSL y mejorar la estabilidad
-            connector = aiohttp.TCPConnector(
-                force_close=True, 
-                limit=1, 
-                enable_cleanup_closed=True,
-                ssl=False  # Ignorar verificación SSL para evitar errores con certificados autofirmados
-            )
-            
-            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            timeout = session.timeout
+            try:
+                # Intentar primero con HEAD, que es más rápido
                 try:
-                    # Intentar primero con HEAD, que es más rápido
-                    try:
-                        async with session.head(channel.url, timeout=timeout) as response:
-                            end_time = datetime.now()
-                            response_time = (end_time - start_time).total_seconds()
-                            
-                            channel.response_time = response_time
-                            channel.last_check = datetime.now().isoformat()
-                            
-                            if response.status == 200:
-                                if response_time > 2.0:
-                                    channel.status = 'slow'
-                                else:
-                                    channel.status = 'online'
+                    async with session.head(channel.url, timeout=timeout, trace_request_ctx=timings) as response:
+                        end_time = datetime.now()
+                        response_time = (end_time - start_time).total_seconds()
+                        
+                        channel.response_time = response_time
+                        channel.last_check = time.time()
+                        
+                        if response.status == 200:
+                            if response_time > SLOW_RESPONSE_TIME:
+                                channel.status = 'slow'
                             else:
-                                # Si HEAD falla, intentar con GET
-                                raise aiohttp.ClientResponseError(None, None, status=response.status)
-                    except (aiohttp.ClientResponseError, aiohttp.ClientError):
-                        # Si HEAD falla, intentar con GET que es más compatible con algunos servidores
-                        async with session.get(channel.url, timeout=timeout) as response:
-                            end_time = datetime.now()
-                            response_time = (end_time - start_time).total_seconds()
-                            
-                            channel.response_time = response_time
-                            channel.last_check = datetime.now().isoformat()
-                            
-                            if response.status == 200:
-                                if response_time > 2.0:
-                                    channel.status = 'slow'
-                                else:
-                                    channel.status = 'online'
+                                channel.status = 'online'
+                        else:
+                            # Si HEAD falla, intentar con GET
+                            raise aiohttp.ClientResponseError(None, None, status=response.status)
+                except (aiohttp.ClientResponseError, aiohttp.ClientError):
+                    # Si HEAD falla, intentar con GET que es más compatible con algunos servidores
+                    async with session.get(channel.url, timeout=timeout, trace_request_ctx=timings) as response:
+                        end_time = datetime.now()
+                        response_time = (end_time - start_time).total_seconds()
+                        
+                        channel.response_time = response_time
+                        channel.last_check = time.time()
+                        
+                        if response.status == 200:
+                            if response_time > SLOW_RESPONSE_TIME:
+                                channel.status = 'slow'
                             else:
-                                channel.status = 'offline'
-                except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionResetError, ssl.SSLError) as e:
-                    # Manejo específico para errores de conexión
-                    print(f"Error de conexión al verificar canal {channel.name}: {str(e)}")
+                                channel.status = 'online'
+                        else:
+                            channel.status = 'offline'
+            except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionResetError, ssl.SSLError) as e:
+                # Manejo específico para errores de conexión
+                print(f"Error de conexión al verificar canal {channel.name}: {str(e)}")
+                channel.status = 'offline'
+                channel.response_time = None
+                channel.last_check = time.time()
+                return e
+        except Exception as e:
+            # Capturar cualquier otra excepción
+            print(f"Error inesperado al verificar canal {channel.name}: {str(e)}")
+            channel.status = 'offline'
+            channel.response_time = None
+            channel.last_check = time.time()
+            return e
+        return None
+
+    async def _probe_channel_content(self, channel: Channel, session: aiohttp.ClientSession,
+                                     timings: Optional[Dict] = None) -> Optional[Exception]:
+        """Verifica un canal leyendo el principio de su contenido.
+
+        Solo se leen los bytes necesarios para reconocer el formato, y nunca más
+        de probe_max_bytes. response_time es el tiempo hasta las cabeceras de la
+        respuesta, ttfb hasta el primer byte del cuerpo y connect_time el de
+        apertura de la conexión (None si se reutilizó una del pool). El canal
+        es lento si el primer byte tarda más de SLOW_RESPONSE_TIME.
+
+        En el modo 'hls', si la respuesta es una lista HLS se sigue hasta un
+        segmento con _check_hls_stream, que decide el estado según el caudal.
+        """
+        channel.connect_time = None
+        channel.ttfb = None
+        if timings is None:
+            timings = {}
+        manifest: Optional[bytes] = None
+        start = time.monotonic()
+        try:
+            async with session.get(channel.url, trace_request_ctx=timings) as response:
+                channel.response_time = time.monotonic() - start
+                channel.connect_time = timings.get('connect')
+                if response.status not in (200, 206):
                     channel.status = 'offline'
-                    channel.response_time = None
-                    channel.last_check = datetime.now().isoformat()
+                    channel.last_check = time.time()
+                    return None
+                
+                data = b''
+                limit = max(self.probe_max_bytes, 1)
+                while len(data) < min(MEDIA_SIGNATURE_BYTES, limit):
+                    chunk = await response.content.read(limit - len(data))
+                    if not chunk:
+                        break
+                    if not data:
+                        channel.ttfb = time.monotonic() - start
+                    data += chunk
+                channel.last_check = time.time()
+                
+                media_type = detect_media_signature(data)
+                if media_type is None:
+                    content_type = response.headers.get('Content-Type', 'desconocido')
+                    print(f"El canal {channel.name} no devuelve un stream (tipo {content_type}, {len(data)} bytes)")
+                    channel.status = 'offline'
+                    return ValueError(f"Contenido sin formato de vídeo reconocible ({content_type})")
+                if media_type == 'hls' and self.check_mode == 'hls':
+                    manifest = data + await _read_limited(response, HLS_MANIFEST_MAX_BYTES - len(data))
+                    base_url = str(response.url)
+                else:
+                    channel.status = 'slow' if channel.ttfb > SLOW_RESPONSE_TIME else 'online'
+            if manifest is not None:
+                channel.status = await self._check_hls_stream(channel, session, manifest, base_url, timings)
+                channel.last_check = time.time()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionResetError, ssl.SSLError) as e:
+            # Manejo específico para errores de conexión
+            print(f"Error de conexión al verificar canal {channel.name}: {str(e)}")
+            channel.status = 'offline'
+            channel.response_time = None
+            channel.last_check = time.time()
+            return e
         except Exception as e:
             # Capturar cualquier otra excepción
             print(f"Error inesperado al verificar canal {channel.name}: {str(e)}")
             channel.status = 'offline'
             channel.response_time = None
-            channel.last_check = datetime.now().isoformat()
+            channel.last_check = time.time()
+            return e
+        return None
+
+    async def _check_hls_stream(self, channel: Channel, session: aiohttp.ClientSession,
+                                manifest: bytes, base_url: str, timings: Optional[Dict] = None) -> str:
+        """Sigue una lista HLS hasta un segmento y devuelve el estado del canal.
+
+        De una lista maestra se elige la variante de menor BANDWIDTH y de la
+        lista de medios, el último segmento (el más cercano al directo). Como
+        mucho se hacen dos peticiones más y del segmento se leen como mucho
+        hls_segment_max_bytes. El canal es lento si el caudal medido en el
+        segmento no alcanza el BANDWIDTH declarado o, sin él, la tasa del
+        propio segmento (tamaño / duración de #EXTINF). Las peticiones se miden
+        en timings, el trace_request_ctx de la verificación.
+        """
+        variants, segments, encrypted = parse_hls_playlist(manifest.decode('utf-8', errors='replace'))
+        bandwidth = None
+        if variants:
+            bandwidth, variant_uri = min(variants)
+            async with session.get(urllib.parse.urljoin(base_url, variant_uri), trace_request_ctx=timings) as response:
+                if response.status != 200:
+                    print(f"Variante HLS no disponible en el canal {channel.name}: código {response.status}")
+                    return 'offline'
+                playlist = await _read_limited(response, HLS_MANIFEST_MAX_BYTES)
+                base_url = str(response.url)
+            _, segments, encrypted = parse_hls_playlist(playlist.decode('utf-8', errors='replace'))
+        if not segments:
+            print(f"La lista HLS del canal {channel.name} no tiene segmentos")
+            return 'offline'
+        
+        duration, segment_uri = segments[-1]
+        limit = max(self.hls_segment_max_bytes, MEDIA_SIGNATURE_BYTES)
+        head = b''
+        size = 0
+        complete = False
+        start = time.monotonic()
+        try:
+            async with session.get(urllib.parse.urljoin(base_url, segment_uri), trace_request_ctx=timings) as response:
+                if response.status not in (200, 206):
+                    print(f"Segmento HLS no disponible en el canal {channel.name}: código {response.status}")
+                    return 'offline'
+                while size < limit:
+                    chunk = await response.content.read(min(DOWNLOAD_CHUNK_SIZE, limit - size))
+                    if not chunk:
+                        complete = True
+                        break
+                    if len(head) < MEDIA_SIGNATURE_BYTES:
+                        head += chunk[:MEDIA_SIGNATURE_BYTES - len(head)]
+                    size += len(chunk)
+        except asyncio.TimeoutError:
+            # Un segmento que no llega a tiempo se evalúa con los bytes recibidos
+            if size == 0:
+                raise
+        elapsed = time.monotonic() - start
+        
+        # Los segmentos cifrados (#EXT-X-KEY) no muestran su formato
+        if not encrypted and detect_media_signature(head) is None:
+            print(f"El segmento HLS del canal {channel.name} no tiene un formato de vídeo reconocible")
+            return 'offline'
+        throughput = size * 8 / elapsed if elapsed > 0 else float('inf')
+        required = bandwidth or (size * 8 / duration if complete and duration > 0 else None)
+        if required and throughput < required * HLS_REALTIME_RATIO:
+            print(f"El canal {channel.name} no alcanza el tiempo real: {throughput / 1e6:.2f} Mbit/s "
+                  f"de {required / 1e6:.2f} Mbit/s necesarios")
+            return 'slow'
+        return 'online'
+
+    def is_check_fresh(self, channel: Channel, now: Optional[float] = None) -> bool:
+        """Indica si el último resultado de verificación del canal sigue vigente según check_ttl."""
+        if channel.last_check is None:
+            return False
+        ttl = self.check_ttl.get(channel.status)
+        if not ttl:
+            return False
+        if now is None:
+            now = time.time()
+        return now - channel.last_check < ttl
+
+    def channels_to_check(self, force: bool = False) -> List[int]:
+        """Posiciones de los canales que check_all_channels verificaría.
+
+        Args:
+            force: Si es True, incluye también los canales con resultado vigente.
+        """
+        if force:
+            return list(range(len(self.channels)))
+        now = time.time()
+        return [i for i, channel in enumerate(self.channels) if not self.is_check_fresh(channel, now)]
+
+    async def check_all_channels(self, force: bool = False) -> None:
+        """Verifica los canales cuyo resultado ya no está vigente.
+
+        Al terminar, last_check_metrics contiene los tiempos por fase y los
+        contadores del barrido, exportables con su método save.
+
+        Args:
+            force: Si es True, verifica todos los canales aunque su último
+                resultado siga vigente según check_ttl.
+        """
+        async for _ in self.iter_check(force=force):
+            pass
+
+    async def check_all_channels_sharded(self, workers: Optional[int] = None, force: bool = False) -> None:
+        """Verifica los canales repartiéndolos entre varios procesos.
+
+        Cada proceso verifica un fragmento de los canales pendientes con su
+        propio bucle de eventos y su propio pool de conexiones, de modo que el
+        trabajo de CPU (TLS, cabeceras, contabilidad) se reparte entre núcleos.
+        Los fragmentos se forman por servidor (_shard_by_host): cada servidor lo
+        verifica un solo proceso, con el límite por servidor completo y un solo
+        pool de conexiones, mientras que el límite global se divide entre los
+        procesos. Los resultados se copian en los canales de este gestor a
+        medida que termina cada fragmento.
+
+        Args:
+            workers: Número de procesos (por defecto, uno por núcleo). Con uno
+                solo equivale a check_all_channels.
+            force: Como en check_all_channels.
+        """
+        pending = self.channels_to_check(force)
+        channels = self.channels
+        shard_indices = _shard_by_host(channels, pending, max(1, workers or os.cpu_count() or 1))
+        workers = len(shard_indices)
+        if workers <= 1:
+            await self.check_all_channels(force)
+            return
+        
+        settings = {
+            'check_mode': self.check_mode,
+            'probe_max_bytes': self.probe_max_bytes,
+            'hls_segment_max_bytes': self.hls_segment_max_bytes,
+            'max_checks_per_host': self.max_checks_per_host,
+            'min_concurrent_checks': self.min_concurrent_checks,
+            'initial_concurrent_checks': max(self.min_concurrent_checks, self.initial_concurrent_checks // workers),
+            'max_concurrent_checks': max(self.min_concurrent_checks, -(-self.max_concurrent_checks // workers)),
+        }
+        metrics = self.last_check_metrics = CheckMetrics()
+        sweep_start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(max_workers=workers)
+        shards = {}
+        try:
+            for shard in shard_indices:
+                future = loop.run_in_executor(executor, _check_shard,
+                                              [(channels[i].name, channels[i].url) for i in shard], settings)
+                shards[future] = shard
+            
+            completed = 0
+            concurrency = 0
+            running = set(shards)
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    indices = shards[future]
+                    try:
+                        results, settled, shard_metrics = future.result()
+                    except Exception as e:
+                        print(f"Error en el proceso de verificación de {len(indices)} canales: {e}")
+                        continue
+                    for index, values in zip(indices, results):
+                        channel = channels[index]
+                        for name, value in zip(SHARD_RESULT_FIELDS, values):
+                            setattr(channel, name, value)
+                        channel.status = sys.intern(channel.status)
+                    self.save_check_results(indices)
+                    metrics.merge(shard_metrics)
+                    completed += len(indices)
+                    concurrency += settled or 0
+                    print(f"Fragmento verificado: {completed} de {len(pending)} canales")
+            self.last_check_concurrency = concurrency
+            metrics.sweep.update(seconds=round(time.monotonic() - sweep_start, 3), channels=len(pending),
+                                 skipped=len(channels) - len(pending), concurrency=concurrency, workers=workers)
+        finally:
+            # Los fragmentos ya en marcha terminan en segundo plano si se cancela
+            for future in shards:
+                future.cancel()
+            executor.shutdown(wait=False)
+        print(f"Verificación en {workers} procesos completada: {completed} canales, "
+              f"{len(channels) - len(pending)} omitidos por tener un resultado vigente")
+
+    async def iter_check(self, indices: Optional[Iterable[int]] = None,
+                         force: bool = False) -> AsyncIterator[CheckResult]:
+        """Verifica canales y genera cada resultado en cuanto termina su verificación.
 
-    async def check_all_channels(self) -> None:
-        # Limitar el número de conexiones simultáneas
-        MAX_CONCURRENT = 50  # Ajustar según necesidad y recursos del sistema
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+        Los resultados llegan en orden de finalización, con los contadores del
+        barrido hasta ese momento. Si se deja de iterar antes del final, las
+        verificaciones pendientes se cancelan.
+
+        Args:
+            indices: Posiciones en channels de los canales a verificar. Por
+                defecto, los que devuelve channels_to_check(force).
+            force: Sin indices, verifica todos los canales aunque su último
+                resultado siga vigente según check_ttl.
+
+        Yields:
+            CheckResult: El resultado de cada canal verificado.
+        """
+        channels = self.channels
+        pending = self.channels_to_check(force) if indices is None else list(indices)
+        skipped_tasks = len(channels) - len(pending) if indices is None else 0
+        
+        # Limitar el número de conexiones simultáneas; el límite se adapta a la red
+        limiter = AdaptiveConcurrencyLimiter(self.min_concurrent_checks, self.max_concurrent_checks,
+                                             self.initial_concurrent_checks)
+        # Límite por servidor: se adquiere antes que el global para que los canales
+        # que esperan a un servidor saturado no ocupen plazas que otros podrían usar
+        # Con max_checks_per_host <= 0 no hay límite por servidor
+        max_per_host = self.max_checks_per_host
+        host_semaphores: Dict[str, asyncio.Semaphore] = {}
         
-        async def check_channel_with_semaphore(channel):
-            async with semaphore:
-                return await self.check_channel(channel)
+        # Una única sesión por barrido: todas las verificaciones comparten el pool de conexiones
+        session = self._create_check_session(self.max_concurrent_checks, max(0, max_per_host))
         
-        # Crear tareas para verificar cada canal
+        # Canales verificados cuyo resultado aún no se ha guardado
+        checked: List[int] = []
+        
+        metrics = self.last_check_metrics = CheckMetrics()
+        sweep_start = time.monotonic()
+        
+        async def check_one(index, channel):
+            token = await limiter.acquire()
+            previous_check = channel.last_check
+            error = None
+            failed = False
+            timings = {}
+            start = time.monotonic()
+            try:
+                error = await self.check_channel(channel, session, timings)
+            except Exception as e:
+                # Registrar el fallo de la tarea sin interrumpir el barrido
+                print(f"Error en tarea de verificación: {e}")
+                error = e
+                failed = True
+            finally:
+                limiter.release(token, isinstance(error, CONGESTION_ERRORS))
+                if channel.last_check != previous_check:
+                    checked.append(index)
+                    if len(checked) >= CHECK_RESULTS_BATCH:
+                        self.save_check_results(checked)
+                        checked.clear()
+            metrics.observe(timings, time.monotonic() - start, channel.status, error)
+            return index, error, failed
+        
+        async def check_channel_with_semaphore(index, channel):
+            if max_per_host <= 0:
+                return await check_one(index, channel)
+            host = _channel_host(channel.url)
+            host_semaphore = host_semaphores.get(host)
+            if host_semaphore is None:
+                host_semaphore = host_semaphores[host] = asyncio.Semaphore(max_per_host)
+            async with host_semaphore:
+                return await check_one(index, channel)
+        
+        # Crear tareas para verificar cada canal pendiente
         tasks = []
-        for channel in self.channels:
-            task = asyncio.create_task(check_channel_with_semaphore(channel))
+        for index in pending:
+            task = asyncio.create_task(check_channel_with_semaphore(index, channels[index]))
             tasks.append(task)
         
-        # Procesar las tareas con manejo de errores
+        # Contadores del barrido
         completed_tasks = 0
         failed_tasks = 0
+        status_counts = {'online': 0, 'slow': 0, 'offline': 0}
         error_types = {}
         
         try:
             for task in asyncio.as_completed(tasks):
-                try:
-                    await task
-                    completed_tasks += 1
-                except asyncio.CancelledError:
-                    # Cancelar todas las tareas pendientes
-                    for t in tasks:
-                        if not t.done():
-                            t.cancel()
-                    raise  # Re-raise para que se maneje en el nivel superior
-                except Exception as e:
+                index, error, failed = await task
+                channel = channels[index]
+                completed_tasks += 1
+                if failed:
                     # Registrar el tipo de error para análisis
-                    error_type = type(e).__name__
-                    if error_type not in error_types:
-                        error_types[error_type] = 0
-                    error_types[error_type] += 1
-                    
-                    print(f"Error en tarea de verificación: {e}")
+                    error_type = type(error).__name__
+                    error_types[error_type] = error_types.get(error_type, 0) + 1
                     failed_tasks += 1
-        except asyncio.CancelledError:
-            print("Verificación cancelada. Limpiando recursos...")
-            # Asegurarse de que todas las tareas se cancelen
-            for task in tasks:
-                if not task.done():
-                    task.cancel()
-            try:
-                # Esperar a que todas las tareas se cancelen (con timeout)
-                await asyncio.wait(tasks, timeout=5)
-            except Exception as e:
-                print(f"Error durante la cancelación de tareas: {e}")
+                elif channel.status in status_counts:
+                    status_counts[channel.status] += 1
+                yield CheckResult(index, channel, error, completed_tasks, len(tasks), failed_tasks,
+                                  status_counts['online'], status_counts['slow'], status_counts['offline'])
+        except (asyncio.CancelledError, GeneratorExit):
+            if completed_tasks < len(tasks):
+                print("Verificación cancelada. Limpiando recursos...")
             raise
         finally:
             # Limpiar recursos
             for task in tasks:
                 if not task.done():
                     task.cancel()
-                try:
-                    await task
-                except (asyncio.CancelledError, Exception):
-                    pass
+            if tasks:
+                # Esperar a que todas las tareas se cancelen (con timeout)
+                await asyncio.wait(tasks, timeout=5)
+            await session.close()
+            # Guardar los cambios pendientes, también si la verificación se interrumpe
+            self.save_check_results(checked)
         
         # Mostrar resumen de errores
         if error_types:
@@ -179,24 +1279,15 @@ class PlaylistManager:
             for error_type, count in error_types.items():
                 print(f"  - {error_type}: {count} ocurrencias")
         
-        print(f"Verificación completada: {completed_tasks} canales procesados, {failed_tasks} fallidos")
-        
-        # Guardar los resultados
-        try:
-            self.save_last_playlist()
-        except Exception as e:
-            print(f"Error al guardar la lista de reproducción: {e}")
-            # Intentar guardar en una ubicación alternativa si falla
-            try:
-                backup_path = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}_last_playlist.json"
-                with open(backup_path, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'channels': [asdict(ch) for ch in self.channels],
-                        'groups': self.groups
-                    }, f, ensure_ascii=False, indent=2)
-                print(f"Se ha creado una copia de seguridad en: {backup_path}")
-            except Exception as backup_error:
-                print(f"No se pudo crear copia de seguridad: {backup_error}")
+        print(f"Verificación completada: {completed_tasks} canales procesados, {failed_tasks} fallidos, "
+              f"{skipped_tasks} omitidos por tener un resultado vigente")
+        metrics.sweep.update(seconds=round(time.monotonic() - sweep_start, 3), channels=len(tasks),
+                             skipped=skipped_tasks, concurrency=limiter.settled_limit if tasks else None)
+        if tasks:
+            self.last_check_concurrency = limiter.settled_limit
+            print(f"Concurrencia estabilizada en {limiter.settled_limit} verificaciones simultáneas "
+                  f"(máximo simultáneo: {limiter.peak_in_flight}, límite máximo: {limiter.peak_limit}, "
+                  f"reducciones: {limiter.decreases})")
     
     def save_working_channels(self, file_path: str) -> None:
         working_channels = [ch for ch in self.channels if ch.status in ['online', 'slow']]
@@ -215,172 +1306,267 @@ class PlaylistManager:
             for channel in channels:
                 status_tag = f'tvg-status="{channel.status}"' if channel.status != 'unknown' else ''
                 response_time_tag = f'tvg-response-time="{channel.response_time:.2f}"' if channel.response_time is not None else ''
-                last_check_tag = f'tvg-last-check="{channel.last_check}"' if channel.last_check else ''
+                last_check_tag = f'tvg-last-check="{datetime.fromtimestamp(channel.last_check).isoformat()}"' if channel.last_check else ''
                 logo_tag = f'tvg-logo="{channel.logo}"' if channel.logo else ''
                 group_tag = f'group-title="{channel.group}"' if channel.group else ''
+                # Conservar el resto de atributos originales (tvg-id, catchup, ...)
+                extra_tags = ' '.join(f'{key}="{value}"' for key, value in (channel.attributes or {}).items())
 
-                extinf_line = f'#EXTINF:-1 tvg-name="{channel.name}" {logo_tag} {group_tag} {status_tag} {response_time_tag} {last_check_tag},{channel.name}\n'
+                extinf_line = f'#EXTINF:-1 tvg-name="{channel.name}" {logo_tag} {group_tag} {status_tag} {response_time_tag} {last_check_tag} {extra_tags},{channel.name}\n'
                 f.write(extinf_line)
                 f.write(f'{channel.url}\n')
     
-    def load_playlist(self, file_path: str, progress_callback=None) -> None:
-        self.channels.clear()
-        self.groups.clear()
-        
-        def process_lines(lines):
-            current_channel = None
-            line_number = 0
-            total_lines = len(lines)
-            processed_lines = ['#EXTM3U']
-            needs_processing = False
-            channel_count = 1
-            
-            # Procesar cada línea y completar metadatos faltantes
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                if not line:
-                    i += 1
-                    continue
-                
-                # Si es una línea EXTINF, mantenerla y su URL
-                if line.startswith('#EXTINF'):
-                    processed_lines.append(line)
-                    # Buscar la siguiente línea no vacía que debería ser la URL
-                    while i + 1 < len(lines):
-                        i += 1
-                        next_line = lines[i].strip()
-                        if next_line and not next_line.startswith('#'):
-                            processed_lines.append(next_line)
-                            break
-                        elif next_line:
-                            processed_lines.append(next_line)
-                # Si es una URL sin metadatos, crear los metadatos
-                elif line.startswith(('http://', 'https://', 'rtsp://', 'rtmp://', 'mmsh://')):
-                    needs_processing = True
-                    new_extinf = f'#EXTINF:-1 tvg-name="Canal {channel_count}" group-title="Sin Grupo" tvg-status="online",Canal {channel_count}'
-                    processed_lines.append(new_extinf)
-                    processed_lines.append(line)
-                    channel_count += 1
-                else:
-                    processed_lines.append(line)
-                i += 1
-            
-            # Si se encontraron URLs sin metadatos, guardar la nueva lista procesada
-            if needs_processing:
-                new_file_path = os.path.join(os.path.dirname(file_path), 'processed_' + os.path.basename(file_path))
-                try:
-                    with open(new_file_path, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(processed_lines))
-                    print(f"Lista procesada guardada en: {new_file_path}")
-                except Exception as e:
-                    print(f"Error al guardar la lista procesada: {e}")
-            
-            # Procesar la lista final
-            current_channel = None
-            for line in processed_lines:
-                line_number += 1
-                if progress_callback:
-                    progress_callback((line_number / len(processed_lines)) * 100, len(self.channels))
-                
-                try:
-                    if line.startswith('#EXTINF'):
-                        # Extraer nombre y metadatos del canal
-                        name_match = re.search('tvg-name="([^"]*)"', line)
-                        group_match = re.search('group-title="([^"]*)"', line)
-                        logo_match = re.search('tvg-logo="([^"]*)"', line)
-                        
-                        name = name_match.group(1) if name_match else ''
-                        if not name:
-                            # Buscar el nombre al final de la línea
-                            name = line.split(',')[-1].strip()
-                            if not name:
-                                name = f'Canal {len(self.channels) + 1}'
-                        
-                        group = group_match.group(1) if group_match else 'Sin Grupo'
-                        logo = logo_match.group(1) if logo_match else None
-                        
-                        current_channel = Channel(name=name, url='', group=group, logo=logo)
-                        
-                        if group not in self.groups:
-                            self.groups.append(group)
-                            
-                    elif line.startswith(('http://', 'https://', 'rtsp://', 'rtmp://', 'mmsh://')):
-                        # Si no hay un canal actual pero hay una URL, crear un canal nuevo
-                        if not current_channel:
-                            name = f'Canal {len(self.channels) + 1}'
-                            current_channel = Channel(name=name, url='', group='Sin Grupo')
-                            if 'Sin Grupo' not in self.groups:
-                                self.groups.append('Sin Grupo')
-                        
-                        try:
-                            # Validar la URL antes de asignarla
-                            parsed_url = urllib.parse.urlparse(line)
-                            if not parsed_url.scheme or not parsed_url.netloc:
-                                print(f"URL malformada en línea {line_number}: {line}")
-                                current_channel.status = 'offline'
-                            current_channel.url = line
-                            self.channels.append(current_channel)
-                            current_channel = None
-                        except Exception as url_error:
-                            print(f"Error al procesar URL en línea {line_number}: {line}")
-                            print(f"Detalle del error: {str(url_error)}")
-                            if current_channel:
-                                current_channel.status = 'offline'
-                                current_channel.url = line
-                                self.channels.append(current_channel)
-                                current_channel = None
-                except Exception as line_error:
-                    print(f"Error procesando línea {line_number}: {line}")
-                    print(f"Detalle del error: {str(line_error)}")
-        
+    def load_playlist(self, file_path: str, progress_callback=None) -> bool:
+        """Carga una lista M3U reemplazando los canales actuales.
+
+        Args:
+            file_path: Ruta de la lista.
+            progress_callback: Se llama con (porcentaje de bytes leídos, canales
+                encontrados) como mucho cada PROGRESS_INTERVAL segundos, y una
+                última vez al terminar. Si devuelve False, la carga se detiene y
+                se conservan los canales leídos hasta entonces.
+
+        Returns:
+            bool: False si la carga se canceló desde progress_callback.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            process_lines(lines)
-            
+            completed = self._load_playlist_file(file_path, 'utf-8', progress_callback)
         except UnicodeDecodeError as e:
             print(f"Error de codificación al leer el archivo {file_path}: {e}")
             print("Intentando con codificación alternativa...")
             try:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    lines = f.readlines()
-                process_lines(lines)
+                completed = self._load_playlist_file(file_path, 'latin-1', progress_callback)
             except Exception as alt_error:
                 print(f"Error al procesar el archivo con codificación alternativa: {str(alt_error)}")
                 raise
         
+        if not completed:
+            print(f"Carga cancelada: {len(self.channels)} canales leídos")
+            return False
         print(f"Lista cargada: {len(self.channels)} canales en {len(self.groups)} grupos")
+        return True
+
+    def _load_playlist_file(self, file_path: str, encoding: str, progress_callback=None) -> bool:
+        """Carga la lista en una sola pasada, leyendo el archivo línea a línea.
+
+        Si hay URLs sin metadatos, la versión completada se escribe en paralelo
+        en un archivo temporal que al final se renombra a 'processed_<nombre>'.
+        El temporal solo se crea al encontrar la primera de esas URLs.
+
+        Returns:
+            bool: False si progress_callback canceló la carga.
+        """
+        self.clear_channels()
+        
+        total_bytes = os.path.getsize(file_path) or 1
+        bytes_read = 0
+        line_start = 0  # Posición en el archivo de la línea que se está analizando
+        report = ProgressThrottle(progress_callback)
+
+        def open_processed_file():
+            return self._open_processed_file(file_path, file_path, 0, line_start,
+                                             lambda raw_line: raw_line.decode(encoding))
+
+        parser = M3UParser(open_processed_file=open_processed_file)
+        try:
+            with open(file_path, 'rb') as f:
+                for raw_line in f:
+                    line_start = bytes_read
+                    bytes_read += len(raw_line)
+                    channel = parser.feed(raw_line.decode(encoding))
+                    if channel is not None:
+                        self.add_channel(channel)
+                    if report.due() and not report(bytes_read / total_bytes * 100, len(self.channels)):
+                        return False
+            return report(100, len(self.channels))
+        finally:
+            self._close_processed_file(parser, file_path)
+
+    def _open_processed_file(self, file_path: str, source_path: str, start: int, end: int,
+                             decode: Callable[[bytes], str]) -> Optional[TextIO]:
+        """Crea el archivo temporal donde M3UParser escribe la versión completada de file_path.
+
+        Se crea al aparecer la primera URL sin metadatos; las líneas anteriores
+        no necesitan cambios y se copian de source_path (los bytes entre start y
+        end, decodificados línea a línea con decode). Como el resto de la
+        lista, se escriben con el fin de línea de la plataforma.
+        """
+        try:
+            processed_file = tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(file_path) or '.',
+                                                         prefix='.processed_', suffix='.tmp', delete=False)
+        except OSError as e:
+            print(f"No se puede crear la lista procesada: {e}")
+            return None
+        try:
+            with open(source_path, 'rb') as source:
+                source.seek(start)
+                remaining = end - start
+                if not source.read(min(remaining, 1024)).lstrip().lstrip(codecs.BOM_UTF8).startswith(b'#EXTM3U'):
+                    processed_file.write('#EXTM3U\n')
+                source.seek(start)
+                for raw_line in source:
+                    if remaining <= 0:
+                        break
+                    processed_file.write(decode(raw_line).rstrip('\r\n') + '\n')
+                    remaining -= len(raw_line)
+        except OSError as e:
+            print(f"No se puede crear la lista procesada: {e}")
+            processed_file.close()
+            os.remove(processed_file.name)
+            return None
+        return processed_file
+
+    def _close_processed_file(self, parser: M3UParser, file_path: str) -> None:
+        """Cierra el archivo de _open_processed_file, si se llegó a crear, y lo conserva como 'processed_<nombre>'."""
+        processed_file = parser.processed_file
+        if processed_file is None:
+            return
+        processed_file.close()
+        processed_path = os.path.join(os.path.dirname(file_path), 'processed_' + os.path.basename(file_path))
+        try:
+            replace_with_temp_file(processed_file.name, processed_path)
+            print(f"Lista procesada guardada en: {processed_path}")
+        except OSError as e:
+            print(f"Error al guardar la lista procesada: {e}")
     
+    def merge_playlists(self, file_paths: Iterable[str], policy: str = 'first',
+                        progress_callback=None) -> Tuple[int, int]:
+        """Añade los canales de varias listas M3U a los actuales sin repetir streams.
+
+        Los canales se identifican por su URL normalizada (normalize_channel_url)
+        mediante un índice hash, así que cada stream queda una sola vez aunque
+        aparezca en varias listas o varias veces en la misma. Un canal repetido
+        conserva la URL y el estado de verificación del primero, y sus metadatos
+        se resuelven según policy.
+
+        Args:
+            file_paths: Rutas de las listas, en orden de prioridad.
+            policy: Una de MERGE_POLICIES.
+            progress_callback: Como en load_playlist, con el porcentaje de bytes
+                leídos del total de las listas. Si devuelve False, la combinación
+                se detiene y se conservan los canales añadidos hasta entonces.
+
+        Returns:
+            Tuple[int, int]: (canales añadidos, duplicados descartados)
+        """
+        if policy not in MERGE_POLICIES:
+            raise ValueError(f"Política de combinación desconocida: {policy}")
+        file_paths = list(file_paths)
+        channels = self.channels
+        url_index: Dict[str, int] = {}
+        for i, channel in enumerate(channels):
+            url_index.setdefault(normalize_channel_url(channel.url), i)
+        
+        total_bytes = sum(os.path.getsize(path) for path in file_paths) or 1
+        bytes_read = 0
+        report = ProgressThrottle(progress_callback)
+        added = duplicates = 0
+        regroup = False
+        # La instantánea guardada ya no corresponde a la lista en memoria
+        self._snapshot_generation = None
+        self._snapshot_updates = 0
+        try:
+            for path in file_paths:
+                parser = M3UParser()
+                with open(path, 'rb') as f:
+                    for raw_line in f:
+                        bytes_read += len(raw_line)
+                        channel = parser.feed(decode_playlist_line(raw_line))
+                        if channel is not None:
+                            key = normalize_channel_url(channel.url)
+                            position = url_index.get(key)
+                            if position is None:
+                                url_index[key] = len(channels)
+                                self.add_channel(channel)
+                                added += 1
+                            else:
+                                regroup |= _merge_channel(channels[position], channel, policy)
+                                if policy != 'first':
+                                    # El nombre o el grupo pueden haber cambiado
+                                    self.search_index.reindex(position, channels[position])
+                                duplicates += 1
+                        if report.due() and not report(bytes_read / total_bytes * 100, len(channels)):
+                            print("Combinación cancelada")
+                            return added, duplicates
+            report(100, len(channels))
+        finally:
+            if regroup:
+                self._rebuild_group_index()
+            print(f"Listas combinadas: {added} canales añadidos, {duplicates} duplicados descartados, "
+                  f"{len(channels)} canales en {len(self.groups)} grupos")
+        return added, duplicates
+
+    def _rebuild_group_index(self) -> None:
+        group_index = self.group_index
+        group_index.clear()
+        for position, channel in enumerate(self.channels):
+            positions = group_index.get(channel.group)
+            if positions is None:
+                positions = group_index[channel.group] = array('I')
+            positions.append(position)
+
     def get_channels_by_group(self, group: str) -> List[Channel]:
         if group == 'Todos los grupos':
             return self.channels
-        return [channel for channel in self.channels if channel.group == group]
+        return [self.channels[i] for i in self.group_index.get(group, ())]
+
+    def search_channels(self, query: str, group: str = 'Todos los grupos') -> Optional[List[Channel]]:
+        """Busca canales por nombre, sin distinguir mayúsculas ni acentos.
+
+        Args:
+            query: Texto a buscar; cada palabra debe aparecer en el nombre.
+            group: Limita la búsqueda a un grupo, como en get_channels_by_group.
+
+        Returns:
+            Optional[List[Channel]]: Los canales encontrados, los más parecidos
+                primero (ver ChannelSearchIndex.search). None si query está vacía.
+        """
+        channels = self.channels
+        positions = self.search_index.search(query, channels, None if group == 'Todos los grupos' else group)
+        if positions is None:
+            return None
+        return [channels[i] for i in positions]
         
-    async def download_playlist_from_url(self, url: str) -> Tuple[bool, str, str]:
+    async def download_playlist_from_url(self, url: str, parse: bool = False,
+                                         progress_callback=None) -> Tuple[bool, str, str]:
         """Descarga una lista M3U desde una URL y la guarda localmente.
-        
+
+        El contenido se escribe en disco por bloques a medida que llega, sin
+        guardar la respuesta completa en memoria. Cada URL tiene un archivo
+        local fijo (download_file_name); si ya existe, la petición es
+        condicional (If-None-Match / If-Modified-Since) y un 304 reutiliza la
+        copia local sin volver a descargarla.
+
         Args:
             url: La URL de la lista M3U a descargar.
-            
+            parse: Si es True, la lista se analiza mientras se descarga y sus
+                canales reemplazan a los actuales, sin volver a leer el archivo
+                con load_playlist. Los canales están en channels antes de que
+                termine la descarga; si esta falla a medias, se conservan los
+                recibidos hasta entonces.
+            progress_callback: Con parse, se llama con (porcentaje, canales
+                encontrados) como en load_playlist; si devuelve False, la
+                descarga se cancela. El porcentaje es 0 si el servidor no
+                indica el tamaño.
+
         Returns:
             Tuple[bool, str, str]: (éxito, mensaje, ruta_del_archivo)
         """
         try:
             print(f"Iniciando descarga desde: {url}")
-            # Crear un nombre de archivo basado en la URL
-            parsed_url = urllib.parse.urlparse(url)
-            file_name = os.path.basename(parsed_url.path)
-            
-            # Si no hay nombre de archivo en la URL, usar un nombre genérico
-            if not file_name or '.' not in file_name:
-                file_name = f"playlist_{datetime.now().strftime('%Y%m%d_%H%M%S')}.m3u"
-            elif not file_name.endswith(('.m3u', '.m3u8')):
-                file_name += '.m3u'
-                
+            file_name = download_file_name(url)
             local_path = os.path.join(self.download_dir, file_name)
             print(f"Archivo de destino: {local_path}")
             
+            # Validadores de la copia local, para que el servidor responda 304 si no cambió
+            headers = {'Accept-Encoding': 'gzip, deflate'}
+            cached = self._read_download_cache().get(url)
+            if cached and os.path.exists(local_path):
+                if cached.get('etag'):
+                    headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    headers['If-Modified-Since'] = cached['last_modified']
+            
             # Configurar el ClientSession con opciones más robustas
             timeout = aiohttp.ClientTimeout(total=30, connect=10)
             # Configurar el conector para ignorar errores SSL y mejorar la estabilidad
@@ -396,35 +1582,25 @@ class PlaylistManager:
                 async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
                     try:
                         print(f"Conectando a {url}...")
-                        async with session.get(url, timeout=timeout) as response:
+                        async with session.get(url, timeout=timeout, headers=headers) as response:
+                            if response.status == 304:
+                                print(f"La lista no ha cambiado, se usa la copia local: {local_path}")
+                                if parse and not self.load_playlist(local_path, progress_callback):
+                                    return False, "Carga cancelada", ""
+                                return True, f"Lista sin cambios: {file_name}", local_path
+                            
                             if response.status != 200:
                                 error_msg = f"Error al descargar: código {response.status}"
                                 print(error_msg)
                                 return False, error_msg, ""
                             
                             print("Descargando contenido...")
-                            content = await response.text()
-                            content_length = len(content)
-                            print(f"Contenido descargado: {content_length} bytes")
-                            
-                            # Verificar que el contenido parece ser una lista M3U
-                            if not content.strip().startswith('#EXTM3U'):
-                                error_msg = "El archivo descargado no parece ser una lista M3U válida"
-                                print(f"{error_msg}. Primeros 100 caracteres: {content[:100]}")
+                            error_msg = await self._stream_playlist_download(response, local_path,
+                                                                             parse, progress_callback)
+                            if error_msg:
                                 return False, error_msg, ""
                             
-                            # Guardar el archivo localmente
-                            try:
-                                with open(local_path, 'w', encoding='utf-8') as f:
-                                    f.write(content)
-                                print(f"Archivo guardado correctamente en {local_path}")
-                            except UnicodeEncodeError as encode_error:
-                                print(f"Error de codificación al guardar: {encode_error}")
-                                # Intentar con otra codificación
-                                with open(local_path, 'w', encoding='latin-1') as f:
-                                    f.write(content)
-                                print(f"Archivo guardado con codificación alternativa en {local_path}")
-                            
+                            self._update_download_cache(url, response.headers)
                             return True, f"Lista descargada correctamente: {file_name}", local_path
                     except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionResetError) as e:
                         error_msg = f"Error de conexión durante la descarga: {str(e)}"
@@ -440,6 +1616,124 @@ class PlaylistManager:
             print(error_msg)
             return False, error_msg, ""
             
-    def download_playlist_from_url_sync(self, url: str) -> Tuple[bool, str, str]:
+    async def _stream_playlist_download(self, response: aiohttp.ClientResponse, local_path: str,
+                                        parse: bool, progress_callback=None) -> Optional[str]:
+        """Escribe la respuesta en local_path por bloques y, si parse es True, la analiza a la vez.
+
+        El archivo se escribe primero en un temporal y solo reemplaza a local_path
+        cuando la descarga termina bien.
+
+        Returns:
+            Optional[str]: Mensaje de error, o None si la descarga fue correcta.
+        """
+        # Con gzip/deflate Content-Length es el tamaño comprimido: el porcentaje no sería fiable
+        compressed = response.headers.get('Content-Encoding', 'identity') != 'identity'
+        total_bytes = 0 if compressed else response.content_length or 0
+        bytes_read = 0
+        report = ProgressThrottle(progress_callback)
+        head = b''  # Primeros bytes, hasta comprobar que es una lista M3U
+        pending = b''  # Línea incompleta al final del último bloque
+        parser: Optional[M3UParser] = None
+        list_start = line_start = 0  # Posiciones en el archivo del #EXTM3U y de la línea que se analiza
+        completed = False
+        fd, temp_path = tempfile.mkstemp(dir=self.download_dir, prefix='.download_', suffix='.tmp')
+
+        def open_processed_file():
+            f.flush()
+            return self._open_processed_file(local_path, temp_path, list_start, line_start, decode_playlist_line)
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    bytes_read += len(chunk)
+                    if parser is None:
+                        head += chunk
+                        start = head.lstrip().lstrip(codecs.BOM_UTF8).lstrip()
+                        if len(start) < len(b'#EXTM3U'):
+                            continue
+                        # Verificar que el contenido parece ser una lista M3U
+                        if not start.startswith(b'#EXTM3U'):
+                            return self._invalid_download_message(head)
+                        chunk, head = start, b''
+                        list_start = line_start = bytes_read - len(start)
+                        if parse:
+                            self.clear_channels()
+                        parser = M3UParser(open_processed_file=open_processed_file)
+                    if not parse:
+                        continue
+                    lines = (pending + chunk).split(b'\n')
+                    pending = lines.pop()
+                    for raw_line in lines:
+                        self._feed_downloaded_line(parser, raw_line)
+                        line_start += len(raw_line) + 1
+                    if report.due():
+                        percent = min(bytes_read / total_bytes * 100, 100) if total_bytes else 0
+                        if not report(percent, len(self.channels)):
+                            print("Descarga cancelada")
+                            return "Descarga cancelada"
+                if parser is None:
+                    return self._invalid_download_message(head)
+                if parse and pending:
+                    self._feed_downloaded_line(parser, pending)
+                if parse:
+                    report(100, len(self.channels))
+            replace_with_temp_file(temp_path, local_path)
+            completed = True
+        finally:
+            if not completed:
+                os.remove(temp_path)
+            if parser is not None:
+                self._close_processed_file(parser, local_path)
+
+        print(f"Contenido descargado: {bytes_read} bytes")
+        print(f"Archivo guardado correctamente en {local_path}")
+        if parse:
+            print(f"Lista cargada: {len(self.channels)} canales en {len(self.groups)} grupos")
+        return None
+
+    def _read_download_cache(self) -> Dict[str, Dict[str, str]]:
+        """Lee el índice URL -> validadores HTTP (ETag, Last-Modified) de las listas descargadas."""
+        cache_path = os.path.join(self.download_dir, DOWNLOAD_CACHE_FILE)
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Error al leer la caché de descargas: {e}")
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _update_download_cache(self, url: str, headers) -> None:
+        """Guarda de forma atómica los validadores de la respuesta recibida para url."""
+        # Releer el índice justo antes de escribir para no perder otras descargas simultáneas
+        cache = self._read_download_cache()
+        cache[url] = {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.download_dir, prefix='.download_cache_', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, ensure_ascii=False, indent=1)
+                replace_with_temp_file(temp_path, os.path.join(self.download_dir, DOWNLOAD_CACHE_FILE))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError as e:
+            print(f"Error al guardar la caché de descargas: {e}")
+
+    def _feed_downloaded_line(self, parser: M3UParser, raw_line: bytes) -> None:
+        channel = parser.feed(decode_playlist_line(raw_line))
+        if channel is not None:
+            self.add_channel(channel)
+
+    @staticmethod
+    def _invalid_download_message(head: bytes) -> str:
+        error_msg = "El archivo descargado no parece ser una lista M3U válida"
+        print(f"{error_msg}. Primeros 100 caracteres: {head[:100].decode('utf-8', errors='replace')}")
+        return error_msg
+
+    def download_playlist_from_url_sync(self, url: str, parse: bool = False,
+                                        progress_callback=None) -> Tuple[bool, str, str]:
         """Versión sincrónica del método download_playlist_from_url."""
-        return asyncio.run(self.download_playlist_from_url(url))
\ No newline at end of file
+        return asyncio.run(self.download_playlist_from_url(url, parse, progress_callback))
\ No newline at end of file
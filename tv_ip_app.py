@@ -1,14 +1,19 @@
 import sys
 import os
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QHBoxLayout, QListWidget, QLabel, QPushButton,
-                             QComboBox, QFileDialog, QListWidgetItem, QSizePolicy,
+                             QHBoxLayout, QListView, QLabel, QPushButton,
+                             QComboBox, QFileDialog, QSizePolicy, QLineEdit,
                              QProgressDialog, QInputDialog, QMessageBox, QMenu, QGridLayout)
 from PyQt6.QtCore import Qt, QEvent, QTimer, QPoint
 from PyQt6.QtGui import QKeyEvent, QColor, QCursor, QAction, QIcon
 import vlc
 import asyncio
 from playlist_manager import PlaylistManager, Channel
+from channel_list import ChannelListModel, ChannelItemDelegate
+from check_worker import ChannelCheckThread
+
+# Canales que se añaden al índice de búsqueda en cada paso de su construcción en segundo plano
+SEARCH_INDEX_STEP = 5000
 
 class TVIPPlayer(QMainWindow):
     def __init__(self):
@@ -33,8 +38,10 @@ class TVIPPlayer(QMainWindow):
         self.current_aspect_ratio = 'auto'
         self.current_scale = 1.0
         
-        # Inicializar el gestor de listas
-        self.playlist_manager = PlaylistManager()
+        # Inicializar el gestor de listas (la última lista se carga en segundo plano)
+        self.playlist_manager = PlaylistManager(lazy_restore=True)
+        # Hilo de la verificación de canales en curso, si la hay
+        self.check_thread = None
         
         # Inicializar VLC con opciones específicas
         vlc_args = [
@@ -68,8 +75,18 @@ class TVIPPlayer(QMainWindow):
         sidebar_layout.addWidget(QLabel('Filtrar por grupo:'))
         sidebar_layout.addWidget(self.group_filter)
         
-        # Lista de canales
-        self.channel_list = QListWidget()
+        # Búsqueda por nombre dentro del grupo seleccionado
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText('Buscar canal...')
+        self.search_box.setClearButtonEnabled(True)
+        sidebar_layout.addWidget(self.search_box)
+        
+        # Lista de canales: la vista solo dibuja las filas visibles del modelo
+        self.channel_list = QListView()
+        self.channel_model = ChannelListModel(self)
+        self.channel_list.setModel(self.channel_model)
+        self.channel_list.setItemDelegate(ChannelItemDelegate(self.channel_list))
+        self.channel_list.setUniformItemSizes(True)
         sidebar_layout.addWidget(QLabel('Canales:'))
         sidebar_layout.addWidget(self.channel_list)
         
@@ -170,22 +187,44 @@ class TVIPPlayer(QMainWindow):
         else:
             layout.addWidget(self.sidebar, 0, 0)
         
+        # Grupos de la última lista guardada, disponibles antes de cargar sus canales
+        self.group_filter.addItems(sorted(self.playlist_manager.groups))
+        
         # Conectar eventos de canales
-        self.channel_list.itemDoubleClicked.connect(self.play_channel)
+        self.channel_list.doubleClicked.connect(self.play_channel)
         self.group_filter.currentTextChanged.connect(self.update_channel_list)
+        self.search_box.textChanged.connect(self.on_search_changed)
+        
+        # Timer que construye por partes el índice de búsqueda de los canales nuevos
+        self.search_index_timer = QTimer(self)
+        self.search_index_timer.timeout.connect(self.build_search_index_step)
         
         # Timer para verificar las pistas de audio disponibles
         self.audio_check_timer = QTimer(self)
         self.audio_check_timer.timeout.connect(self.check_audio_tracks)
         self.audio_check_timer.start(1000)  # Verificar cada segundo
         
+        # Timer para mostrar los canales de la última lista cuando termine su carga
+        self.restore_check_timer = QTimer(self)
+        self.restore_check_timer.timeout.connect(self.check_playlist_restored)
+        self.restore_check_timer.start(100)
+        
         # Instalar event filter global para clic derecho sobre video (VLC)
         QApplication.instance().installEventFilter(self)
 
+    def check_playlist_restored(self):
+        """Muestra los canales de la última lista guardada cuando termina su carga en segundo plano"""
+        if self.playlist_manager.restore_pending:
+            return
+        self.restore_check_timer.stop()
+        if self.playlist_manager.channels:
+            self.update_channel_list(self.group_filter.currentText())
+
     def load_playlist(self):
-        file_name, _ = QFileDialog.getOpenFileName(self, 'Abrir Lista M3U',
-                                                 '', 'M3U Files (*.m3u *.m3u8)')
-        if file_name:
+        # Si se eligen varias listas, se combinan sin repetir canales
+        file_names, _ = QFileDialog.getOpenFileNames(self, 'Abrir Lista M3U',
+                                                     '', 'M3U Files (*.m3u *.m3u8)')
+        if file_names:
             try:
                 # Crear diálogo de progreso
                 progress = QProgressDialog('Cargando lista de canales...', 'Cancelar', 0, 100, self)
@@ -194,16 +233,24 @@ class TVIPPlayer(QMainWindow):
                 progress.setAutoClose(True)
                 progress.setAutoReset(True)
                 
+                # load_playlist llama a esta función como mucho 20 veces por segundo
                 def update_progress(percent, channels_count):
                     if progress.wasCanceled():
-                        return
+                        return False
                     progress.setValue(int(percent))
                     progress.setLabelText(f'Cargando lista de canales...\nCanales encontrados: {channels_count}')
                     QApplication.processEvents()
+                    return not progress.wasCanceled()
                 
-                self.playlist_manager.load_playlist(file_name, progress_callback=update_progress)
+                if len(file_names) == 1:
+                    completed = self.playlist_manager.load_playlist(file_names[0], progress_callback=update_progress)
+                else:
+                    self.playlist_manager.clear_channels()
+                    self.playlist_manager.merge_playlists(file_names, progress_callback=update_progress)
+                    completed = not progress.wasCanceled()
                 progress.setValue(100)
-                self.playlist_manager.save_last_playlist()
+                if completed:
+                    self.playlist_manager.save_last_playlist()
                 
                 # Desconectar señal existente si existe
                 try:
@@ -222,8 +269,12 @@ class TVIPPlayer(QMainWindow):
                 # Conectar el cambio de grupo
                 self.group_filter.currentTextChanged.connect(self.update_channel_list)
                 
-                QMessageBox.information(self, 'Lista Cargada', 
-                                      f'Se cargaron {len(self.playlist_manager.channels)} canales en {len(self.playlist_manager.groups)} grupos.')
+                if completed:
+                    QMessageBox.information(self, 'Lista Cargada', 
+                                          f'Se cargaron {len(self.playlist_manager.channels)} canales en {len(self.playlist_manager.groups)} grupos.')
+                else:
+                    QMessageBox.information(self, 'Carga Cancelada', 
+                                          f'Carga cancelada: se muestran los {len(self.playlist_manager.channels)} canales leídos.')
             except Exception as e:
                 # Mostrar un mensaje de error detallado al usuario
                 error_message = f"Error al cargar la lista: {str(e)}"
@@ -232,48 +283,21 @@ class TVIPPlayer(QMainWindow):
                                    error_message + "\n\nRevise el formato de la lista y asegúrese de que sea un archivo M3U válido.")
     
     def update_channel_list(self, group: str):
-        self.channel_list.clear()
-        channels = self.playlist_manager.get_channels_by_group(group)
-        for channel in channels:
-            item = QListWidgetItem()
-            # Crear un widget personalizado para cada canal
-            channel_widget = QWidget()
-            layout = QHBoxLayout(channel_widget)
-            
-            # Nombre del canal
-            name_label = QLabel(channel.name)
-            layout.addWidget(name_label)
-            
-            # Estado del canal
-            status_label = QLabel()
-            if channel.status == 'online':
-                status_label.setStyleSheet('color: green;')
-                status_label.setText('✓ Online')
-            elif channel.status == 'slow':
-                status_label.setStyleSheet('color: orange;')
-                status_label.setText('⚠ Lento')
-            elif channel.status == 'offline':
-                status_label.setStyleSheet('color: red;')
-                status_label.setText('✗ Offline')
-            else:
-                status_label.setText('? Desconocido')
-            
-            layout.addWidget(status_label)
-            layout.addStretch()
-            
-            # Tiempo de respuesta si está disponible
-            if channel.response_time is not None:
-                response_label = QLabel(f'{channel.response_time:.2f}s')
-                response_label.setStyleSheet('color: gray;')
-                layout.addWidget(response_label)
-            
-            channel_widget.setLayout(layout)
-            
-            # Configurar el item
-            item.setSizeHint(channel_widget.sizeHint())
-            item.setData(Qt.ItemDataRole.UserRole, channel)
-            self.channel_list.addItem(item)
-            self.channel_list.setItemWidget(item, channel_widget)
+        channels = self.playlist_manager.search_channels(self.search_box.text(), group)
+        if channels is None:
+            channels = self.playlist_manager.get_channels_by_group(group)
+        self.channel_model.set_channels(channels)
+        if not self.search_index_timer.isActive():
+            self.search_index_timer.start(0)
+    
+    def on_search_changed(self, text):
+        self.update_channel_list(self.group_filter.currentText())
+    
+    def build_search_index_step(self):
+        """Indexa un bloque de canales nuevos; el timer se detiene cuando no quedan."""
+        manager = self.playlist_manager
+        if manager.restore_pending or manager.search_index.sync(manager.channels, SEARCH_INDEX_STEP) == 0:
+            self.search_index_timer.stop()
             
     def play_channel(self, item):
         try:
@@ -411,87 +435,58 @@ class TVIPPlayer(QMainWindow):
             print(f"Error en el manejo de eventos: {e}")
             return False
 
-    async def check_channels_async(self):
-        progress = QProgressDialog('Verificando canales...', 'Cancelar', 0, len(self.playlist_manager.channels), self)
-        progress.setWindowModality(Qt.WindowModality.WindowModal)
-        progress.setMinimumDuration(500)  # Mostrar diálogo solo si tarda más de 500ms
-        progress.setValue(0)
-        progress.show()
-        
-        # Variable para rastrear si la operación fue cancelada
-        was_cancelled = False
-        
-        try:
-            # Configurar una función de actualización para el progreso
-            completed_count = 0
-            
-            # Modificar el método check_all_channels para que actualice el progreso
-            original_check_channel = self.playlist_manager.check_channel
-            
-            async def wrapped_check_channel(channel):
-                nonlocal completed_count
-                try:
-                    await original_check_channel(channel)
-                finally:
-                    completed_count += 1
-                    progress.setValue(completed_count)
-                    # Procesar eventos para mantener la UI responsiva
-                    QApplication.processEvents()
-                    
-                    # Verificar si el usuario canceló la operación
-                    if progress.wasCanceled():
-                        raise asyncio.CancelledError("Usuario canceló la operación")
-            
-            # Reemplazar temporalmente el método
-            self.playlist_manager.check_channel = wrapped_check_channel
-            
-            try:
-                # Ejecutar verificación con el método modificado
-                await self.playlist_manager.check_all_channels()
-            finally:
-                # Restaurar el método original
-                self.playlist_manager.check_channel = original_check_channel
-        
-        except asyncio.CancelledError:
-            was_cancelled = True
-            print("Verificación de canales cancelada por el usuario")
-        except Exception as e:
-            print(f"Error al ejecutar verificación de canales: {str(e)}")
-            QMessageBox.warning(self, 'Error de Verificación', 
-                              f'Ocurrió un error durante la verificación de canales:\n{str(e)}')
-        finally:
-            progress.setValue(len(self.playlist_manager.channels))
-            progress.close()
-            
-            # Actualizar la lista solo si no fue cancelada
-            if not was_cancelled:
-                self.update_channel_list(self.group_filter.currentText())
-                
-                # Mostrar resumen de verificación
-                online_count = sum(1 for ch in self.playlist_manager.channels if ch.status == 'online')
-                slow_count = sum(1 for ch in self.playlist_manager.channels if ch.status == 'slow')
-                offline_count = sum(1 for ch in self.playlist_manager.channels if ch.status == 'offline')
-                
-                if was_cancelled:
-                    message = "La verificación fue cancelada.\n\nResultados parciales:"
-                else:
-                    message = "Verificación completada.\n\nResultados:"
-                
-                QMessageBox.information(self, 'Verificación de Canales', 
-                                      f'{message}\n'
-                                      f'- Canales en línea: {online_count}\n'
-                                      f'- Canales lentos: {slow_count}\n'
-                                      f'- Canales fuera de línea: {offline_count}\n'
-                                      f'- Total verificado: {completed_count}')
-
     def check_channels(self):
-        try:
-            # Configurar una política de manejo de eventos para evitar errores de conexión
-            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-            asyncio.run(self.check_channels_async())
-        except Exception as e:
-            print(f"Error al ejecutar verificación de canales: {e}")
-            QMessageBox.warning(self, 'Error', f'No se pudo completar la verificación: {str(e)}')
+        if self.check_thread is not None:
+            return
+        # La verificación se ejecuta en su propio hilo; la interfaz solo recibe el progreso
+        thread = ChannelCheckThread(self.playlist_manager, parent=self)
+        # Los canales con un resultado vigente no se vuelven a verificar
+        self.check_skipped_count = len(self.playlist_manager.channels) - thread.total
+        self.check_progress = QProgressDialog('Verificando canales...', 'Cancelar', 0, thread.total, self)
+        self.check_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.check_progress.setMinimumDuration(500)  # Mostrar diálogo solo si tarda más de 500ms
+        self.check_progress.setAutoReset(False)
+        self.check_progress.setValue(0)
+        self.check_progress.canceled.connect(thread.cancel)
+        thread.channels_updated.connect(self.on_channels_updated)
+        thread.progress.connect(self.on_check_progress)
+        thread.check_failed.connect(self.on_check_failed)
+        thread.finished.connect(self.on_check_finished)
+        self.check_thread = thread
+        thread.start()
+    
+    def on_check_progress(self, completed, total):
+        self.check_progress.setValue(completed)
+    
+    def on_channels_updated(self, positions):
+        # Repintar en su sitio las filas de los canales con un resultado nuevo
+        channels = self.playlist_manager.channels
+        self.channel_model.refresh_channels(channels[i] for i in positions)
+    
+    def on_check_failed(self, message):
+        QMessageBox.warning(self, 'Error de Verificación', 
+                          f'Ocurrió un error durante la verificación de canales:\n{message}')
+    
+    def on_check_finished(self):
+        thread = self.check_thread
+        self.check_thread = None
+        self.check_progress.close()
+        thread.deleteLater()
+        
+        # Las filas ya se actualizaron durante la verificación, sin rehacer la lista
+        if not thread.was_cancelled:
+            # Mostrar resumen de verificación
+            online_count = sum(1 for ch in self.playlist_manager.channels if ch.status == 'online')
+            slow_count = sum(1 for ch in self.playlist_manager.channels if ch.status == 'slow')
+            offline_count = sum(1 for ch in self.playlist_manager.channels if ch.status == 'offline')
+            
+            QMessageBox.information(self, 'Verificación de Canales', 
+                                  f'Verificación completada.\n\nResultados:\n'
+                                  f'- Canales en línea: {online_count}\n'
+                                  f'- Canales lentos: {slow_count}\n'
+                                  f'- Canales fuera de línea: {offline_count}\n'
+                                  f'- Total verificado: {thread.completed}\n'
+                                  f'- Omitidos por tener un resultado reciente: {self.check_skipped_count}')
     
     def save_working_channels(self):
         file_name, _ = QFileDialog.getSaveFileName(self, 'Guardar Canales Funcionales',
@@ -504,23 +499,29 @@ class TVIPPlayer(QMainWindow):
                                      'Ingrese la URL de la lista M3U:')
         if ok and url:
             # Mostrar diálogo de progreso
-            progress = QProgressDialog('Descargando lista...', 'Cancelar', 0, 0, self)
+            progress = QProgressDialog('Descargando lista...', 'Cancelar', 0, 100, self)
             progress.setWindowModality(Qt.WindowModality.WindowModal)
             progress.show()
             
+            def update_progress(percent, channels_count):
+                if progress.wasCanceled():
+                    return False
+                progress.setValue(int(percent))
+                progress.setLabelText(f'Descargando lista...\nCanales encontrados: {channels_count}')
+                QApplication.processEvents()
+                return not progress.wasCanceled()
+            
             try:
                 # Configurar una política de manejo de eventos para evitar errores de conexión
                 asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
                 
                 print(f"Iniciando descarga desde URL: {url}")
-                # Descargar la lista con manejo de excepciones mejorado
-                success, message, file_path = self.playlist_manager.download_playlist_from_url_sync(url)
+                # Descargar la lista cargando sus canales a medida que llegan
+                success, message, file_path = self.playlist_manager.download_playlist_from_url_sync(
+                    url, parse=True, progress_callback=update_progress)
                 
                 if success:
                     try:
-                        print(f"Descarga exitosa, cargando lista desde: {file_path}")
-                        # Cargar la lista descargada
-                        self.playlist_manager.load_playlist(file_path)
                         self.playlist_manager.save_last_playlist()
                         
                         # Actualizar filtro de grupos
@@ -543,6 +544,12 @@ class TVIPPlayer(QMainWindow):
                                           f'La lista se descargó pero no se pudo cargar:\n{str(e)}\n\n'
                                           f'Archivo: {file_path}')
                 else:
+                    # Los canales recibidos antes del error o la cancelación ya están cargados
+                    self.group_filter.clear()
+                    self.group_filter.addItem('Todos los grupos')
+                    self.group_filter.addItems(self.playlist_manager.groups)
+                    self.update_channel_list('Todos los grupos')
+                    
                     print(f"Error en la descarga: {message}")
                     QMessageBox.warning(self, 'Error de Descarga', 
                                       f'{message}\n\nVerifique que la URL sea correcta y que el servidor esté disponible.')
@@ -687,37 +694,16 @@ class TVIPPlayer(QMainWindow):
             thread.start()
 
     def process_and_filter_channels(self, file_path):
-        # Procesar la lista seleccionada (no la actual), sin afectar la UI
-        import asyncio
+        # Procesar la lista seleccionada (no la actual), sin afectar la UI ni la última lista guardada
         import tempfile
         from datetime import datetime
-        from playlist_manager import PlaylistManager
-        # 1. Cargar la lista seleccionada en un PlaylistManager separado
-        pm = PlaylistManager()
-        try:
-            pm.load_playlist(file_path)
-        except Exception as e:
-            print(f"Error al cargar la lista seleccionada: {e}")
-            return
-        # 2. Completar metadatos ya lo hace load_playlist
-        # 3. Verificar canales (asyncio, en este hilo)
-        loop = None
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(pm.check_all_channels())
-        except Exception as e:
-            print(f"Error en verificación de canales: {e}")
-        finally:
-            if loop:
-                loop.close()
-        # 4. Guardar solo los funcionales
-        working_channels = [ch for ch in pm.channels if ch.status in ['online', 'slow']]
-        if working_channels:
-            temp_dir = tempfile.gettempdir()
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            temp_file = os.path.join(temp_dir, f"canales_funcionales_{timestamp}.m3u")
-            pm.save_m3u_playlist(temp_file, working_channels)
+        from tv_ip_filter import filter_source
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        temp_file = os.path.join(tempfile.gettempdir(), f"canales_funcionales_{timestamp}.m3u")
+        summary = filter_source(file_path, temp_file)
+        if 'error' in summary:
+            print(f"Error al procesar la lista seleccionada: {summary['error']}")
+        elif summary['working']:
             print(f"Lista funcional generada: {temp_file}")
         else:
             print("No hay canales funcionales tras el filtrado.")
@@ -744,6 +730,13 @@ class TVIPPlayer(QMainWindow):
         else:
             super().keyPressEvent(event)
 
+    def closeEvent(self, event):
+        # No destruir el hilo de verificación mientras sigue en marcha
+        if self.check_thread is not None:
+            self.check_thread.cancel()
+            self.check_thread.wait()
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self.update_menu_button_position()
@@ -0,0 +1,177 @@
+"""Filtrado de listas M3U sin interfaz gráfica.
+
+Carga cada lista (archivo local o URL), verifica sus canales y escribe una
+lista con los canales que funcionan por cada entrada, más un resumen JSON.
+Cada entrada se procesa en su propio proceso, con su propio bucle de eventos,
+de modo que el análisis y la verificación se reparten entre los núcleos.
+No importa Qt ni VLC, así que puede ejecutarse desde cron en un servidor sin
+pantalla.
+
+Uso:
+    python tv_ip_filter.py lista1.m3u http://proveedor/lista.m3u -o filtradas/
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from check_metrics import CheckMetrics
+from playlist_manager import PlaylistManager, CHECK_MODES, URL_PREFIXES, download_file_name
+
+
+def is_url(source: str) -> bool:
+    return source.startswith(URL_PREFIXES)
+
+
+def output_file_names(sources: List[str]) -> List[str]:
+    """Nombre del archivo filtrado de cada entrada, sin repetir nombres."""
+    names = []
+    used = set()
+    for source in sources:
+        base_name = download_file_name(source) if is_url(source) else os.path.basename(source)
+        stem = os.path.splitext(base_name)[0] or 'lista'
+        name = f"{stem}_funcionales.m3u"
+        suffix = 2
+        while name in used:
+            name = f"{stem}_{suffix}_funcionales.m3u"
+            suffix += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+
+async def _filter_source(source: str, output_path: str, check_mode: str, workers: int) -> Dict:
+    manager = PlaylistManager(last_playlist_path=None)
+    manager.check_mode = check_mode
+    if is_url(source):
+        success, message, _ = await manager.download_playlist_from_url(source, parse=True)
+        if not success:
+            raise RuntimeError(message)
+    else:
+        manager.load_playlist(source)
+
+    if workers > 1:
+        await manager.check_all_channels_sharded(workers, force=True)
+    else:
+        await manager.check_all_channels(force=True)
+
+    working_channels = [ch for ch in manager.channels if ch.status in ('online', 'slow')]
+    manager.save_m3u_playlist(output_path, working_channels)
+    counts = {'online': 0, 'slow': 0, 'offline': 0}
+    for channel in manager.channels:
+        if channel.status in counts:
+            counts[channel.status] += 1
+    return {
+        'channels': len(manager.channels),
+        'working': len(working_channels),
+        **counts,
+        'concurrency': manager.last_check_concurrency,
+        'metrics': manager.last_check_metrics.to_dict() if manager.last_check_metrics else None,
+    }
+
+
+def filter_source(source: str, output_path: str, check_mode: str = 'head', quiet: bool = False,
+                  workers: int = 1) -> Dict:
+    """Carga, verifica y filtra una lista. Se ejecuta en un proceso del pool.
+
+    Con workers > 1, la verificación de la lista se reparte a su vez entre
+    ese número de procesos (PlaylistManager.check_all_channels_sharded).
+
+    Returns:
+        Dict: Resumen de la entrada; si falló, con el mensaje en 'error'.
+    """
+    start = time.monotonic()
+    summary = {'source': source, 'output': output_path}
+    output = open(os.devnull, 'w') if quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(output):
+            summary.update(asyncio.run(_filter_source(source, output_path, check_mode, workers)))
+    except Exception as e:
+        summary['error'] = str(e)
+    finally:
+        if quiet:
+            output.close()
+    summary['seconds'] = round(time.monotonic() - start, 2)
+    return summary
+
+
+def filter_sources(sources: List[str], output_dir: str, check_mode: str = 'head',
+                   jobs: Optional[int] = None, quiet: bool = False, workers: int = 1) -> List[Dict]:
+    """Filtra varias listas en paralelo, una por proceso.
+
+    Returns:
+        List[Dict]: El resumen de cada entrada, en el orden de sources.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = [os.path.join(output_dir, name) for name in output_file_names(sources)]
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(sources)))
+    summaries: List[Optional[Dict]] = [None] * len(sources)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(filter_source, source, path, check_mode, quiet, workers): i
+                   for i, (source, path) in enumerate(zip(sources, output_paths))}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                # El proceso terminó de forma anómala
+                summary = {'source': sources[i], 'output': output_paths[i], 'error': str(e)}
+            summaries[i] = summary
+            if 'error' in summary:
+                print(f"[error] {summary['source']}: {summary['error']}", file=sys.stderr)
+            else:
+                print(f"[ok] {summary['source']}: {summary['working']} de {summary['channels']} canales "
+                      f"funcionan -> {summary['output']} ({summary['seconds']} s)")
+    return summaries
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Verifica listas M3U (archivos o URLs) y guarda solo los canales que funcionan.')
+    parser.add_argument('sources', nargs='+', help='Archivos .m3u/.m3u8 o URLs de listas')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='Carpeta de las listas filtradas y del resumen (por defecto, la actual)')
+    parser.add_argument('-s', '--summary', help='Ruta del resumen JSON (por defecto, resumen.json en la carpeta de salida)')
+    parser.add_argument('-j', '--jobs', type=int, help='Procesos en paralelo (por defecto, uno por núcleo)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Procesos que verifican cada lista (útil con pocas listas muy grandes)')
+    parser.add_argument('-m', '--mode', choices=CHECK_MODES, default='head', help='Modo de verificación')
+    parser.add_argument('--metrics',
+                        help='Guardar los tiempos por fase y los contadores de todas las listas '
+                             '(texto de Prometheus si termina en .prom, si no JSON)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='No mostrar el detalle de cada canal')
+    args = parser.parse_args(argv)
+
+    started = datetime.now()
+    summaries = filter_sources(args.sources, args.output_dir, args.mode, args.jobs, args.quiet,
+                               args.workers)
+    summary_path = args.summary or os.path.join(args.output_dir, 'resumen.json')
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'started': started.isoformat(timespec='seconds'),
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'mode': args.mode,
+            'sources': summaries,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Resumen guardado en {summary_path}")
+    if args.metrics:
+        metrics = CheckMetrics()
+        for summary in summaries:
+            if summary.get('metrics'):
+                metrics.merge(summary['metrics'])
+        metrics.sweep.update(sources=len(summaries),
+                             seconds=round((datetime.now() - started).total_seconds(), 3),
+                             channels=sum(summary.get('channels', 0) for summary in summaries))
+        metrics.save(args.metrics)
+        print(f"Métricas guardadas en {args.metrics}")
+    return 1 if any('error' in summary for summary in summaries) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())